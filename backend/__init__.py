@@ -0,0 +1,25 @@
+import importlib
+import os
+import sys
+
+# 後端內部採用扁平匯入（from services... / from models...），因為容器內以
+# cwd=backend 啟動 uvicorn main:app。讓 import backend.* 在任何 cwd 都能
+# 解析這些匯入：把本目錄加入 sys.path（取代各測試檔自行 append 的寫法）
+_BACKEND_DIR = os.path.dirname(__file__)
+if _BACKEND_DIR not in sys.path:
+    sys.path.insert(0, _BACKEND_DIR)
+
+# 扁平匯入與套件匯入必須解析到同一個模組物件，否則同一個類別會被定義
+# 兩次，isinstance 檢查與 patch 都會失效。以扁平模組為準，把 backend.*
+# 名稱登錄為別名
+for _name in (
+    'models',
+    'models.battery',
+    'services',
+    'services.claude_vision_service',
+    'services.database_service',
+    'services.image_processor',
+    'utils',
+    'utils.csv_exporter',
+):
+    sys.modules.setdefault(f'{__name__}.{_name}', importlib.import_module(_name))
@@ -1,17 +1,40 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import List, Optional
 import uvicorn
+import asyncio
+import csv
+import io
 import os
 from datetime import datetime
+from decouple import config
 
 from services.image_processor import ImageProcessor
 from services.database_service import DatabaseService
 from models.battery import BatteryCellResponse, BatchProcessResponse
 from utils.csv_exporter import CSVExporter
 
-app = FastAPI(title="電池 OQC 系統", version="1.0.0")
+# orjson 序列化 JSON 回應比標準函式庫快數倍，未安裝時改用預設編碼器
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as _default_response_class
+except ImportError:
+    _default_response_class = JSONResponse
+
+app = FastAPI(title="電池 OQC 系統", version="1.0.0", default_response_class=_default_response_class)
+
+# 同時處理的 Claude API 請求數量上限
+CLAUDE_CONCURRENCY = int(config('CLAUDE_CONCURRENCY', default=5))
+
+# 超過此圖片數量時改用 Claude Message Batches API
+CLAUDE_BATCH_THRESHOLD = int(config('CLAUDE_BATCH_THRESHOLD', default=10))
+
+# CSV 串流匯出時每次從資料庫撈取的筆數
+CSV_EXPORT_PAGE_SIZE = int(config('CSV_EXPORT_PAGE_SIZE', default=1000))
+
+# 支援的圖片副檔名（frozenset 查找為 O(1)，大量檔案時優於 endswith 鏈）
+IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png'})
 
 # CORS middleware
 app.add_middleware(
@@ -56,18 +79,50 @@ async def process_images():
         if not os.path.exists(data_path):
             raise HTTPException(status_code=404, detail="Data folder not found")
         
+        # scandir 一次取回目錄項目資訊，免去逐檔 stat
+        with os.scandir(data_path) as entries:
+            image_files = [
+                (entry.name, entry.path)
+                for entry in entries
+                if entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS
+            ]
+
+        # 大量圖片改用 Claude Message Batches API（成本較低、吞吐量較高）
+        if len(image_files) > CLAUDE_BATCH_THRESHOLD and image_processor.claude_service.is_available():
+            bulk_results = await image_processor.process_images_bulk(
+                [image_path for _, image_path in image_files]
+            )
+
+            results = []
+            for image_file, _ in image_files:
+                for battery in bulk_results.get(image_file, []):
+                    battery.image_file = image_file
+                    results.append(battery)
+
+            return results
+
+        # 以有限並發同時處理所有圖片（工作負載主要受 Claude API 延遲影響）
+        semaphore = asyncio.Semaphore(CLAUDE_CONCURRENCY)
+
+        async def process_one(image_path: str):
+            async with semaphore:
+                return await image_processor.process_image(image_path)
+
+        nested_results = await asyncio.gather(
+            *(process_one(path) for _, path in image_files),
+            return_exceptions=True
+        )
+
         results = []
-        image_files = [f for f in os.listdir(data_path) if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
-        
-        for image_file in image_files:
-            image_path = os.path.join(data_path, image_file)
-            battery_data = await image_processor.process_image(image_path)
-            
+        for (image_file, _), battery_data in zip(image_files, nested_results):
+            if isinstance(battery_data, BaseException):
+                raise battery_data
+
             if battery_data:
                 for battery in battery_data:
                     battery.image_file = image_file
                     results.append(battery)
-        
+
         return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing images: {str(e)}")
@@ -76,16 +131,14 @@ async def process_images():
 async def save_batteries(batteries: List[BatteryCellResponse]):
     """儲存電池資料到資料庫"""
     try:
-        saved_batteries = []
-        for battery in batteries:
-            saved_battery = await db_service.save_battery(battery.dict())
-            saved_batteries.append(saved_battery)
-        
-        # 記錄批次處理
+        # 單一交易內批次寫入電池資料與批次處理記錄
         batch_name = f"Batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        await db_service.save_batch_process(batch_name, len(saved_batteries))
-        
-        return {"message": f"Successfully saved {len(saved_batteries)} batteries", "count": len(saved_batteries)}
+        saved_count = await db_service.save_batteries_bulk(
+            [battery.dict() for battery in batteries],
+            batch_name
+        )
+
+        return {"message": f"Successfully saved {saved_count} batteries", "count": saved_count}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error saving batteries: {str(e)}")
 
@@ -100,15 +153,39 @@ async def get_batteries(skip: int = 0, limit: int = 100):
 
 @app.get("/export-csv")
 async def export_csv():
-    """匯出電池資料為 CSV"""
+    """匯出電池資料為 CSV（分頁串流輸出，記憶體用量與資料總量無關）"""
     try:
-        batteries = await db_service.get_batteries()
-        csv_file = csv_exporter.export_batteries(batteries)
-        
-        return FileResponse(
-            path=csv_file,
-            filename=f"battery_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-            media_type='application/octet-stream'
+        # 先撈第一頁，讓資料庫錯誤能以 500 回應而不是中斷串流
+        first_page = await db_service.get_batteries(skip=0, limit=CSV_EXPORT_PAGE_SIZE)
+
+        async def iter_csv():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+
+            # utf-8-sig BOM 讓 Excel 正確辨識編碼
+            yield '\ufeff'
+            writer.writerow(CSVExporter.EXPORT_COLUMNS)
+            yield buffer.getvalue()
+
+            page = first_page
+            skip = 0
+            while page:
+                buffer.seek(0)
+                buffer.truncate(0)
+                for battery in page:
+                    writer.writerow(CSVExporter.battery_row(battery))
+                yield buffer.getvalue()
+
+                if len(page) < CSV_EXPORT_PAGE_SIZE:
+                    break
+                skip += CSV_EXPORT_PAGE_SIZE
+                page = await db_service.get_batteries(skip=skip, limit=CSV_EXPORT_PAGE_SIZE)
+
+        filename = f"battery_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        return StreamingResponse(
+            iter_csv(),
+            media_type='text/csv',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error exporting CSV: {str(e)}")
@@ -123,4 +200,13 @@ async def get_batches():
         raise HTTPException(status_code=500, detail=f"Error retrieving batches: {str(e)}")
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # uvloop 事件迴圈與 httptools HTTP 解析器皆為 C 實作（uvicorn[standard] 內含）
+    # 多 worker 讓 CPU 密集的圖片前處理分散到多個核心（app 以匯入字串指定）
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=int(config('WEB_CONCURRENCY', default=4))
+    )
\ No newline at end of file
@@ -1,51 +1,53 @@
+import asyncio
 import base64
+import hashlib
+import io
 import json
-from typing import List, Optional, Dict, Any
+import os
+import re
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Optional, Dict, Any, Tuple
 from anthropic import Anthropic
+from PIL import Image
 from decouple import config
 import logging
 
 from models.battery import BatteryCellResponse
 
+# orjson（Rust 實作）解析 JSON 比標準函式庫快數倍
+# 未安裝時改用標準 json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
-class ClaudeVisionService:
-    """
-    Anthropic Claude AI 圖片識別服務
-    用於識別電池芯的各項參數資訊
-    """
-    
-    def __init__(self):
-        self.api_key = config('ANTHROPIC_API_KEY', default='')
-        self.model = config('CLAUDE_MODEL', default='claude-3-5-sonnet-20241022')
-        
-        if self.api_key:
-            self.client = Anthropic(api_key=self.api_key)
-            logger.info("Claude Vision Service initialized with API key")
-        else:
-            self.client = None
-            logger.info("Claude Vision Service initialized without API key (will use fallback OCR)")
-    
-    def is_available(self) -> bool:
-        """檢查 Claude AI 服務是否可用"""
-        return self.client is not None and bool(self.api_key)
-    
-    def encode_image_to_base64(self, image_path: str) -> Optional[str]:
-        """將圖片編碼為 base64 格式"""
-        try:
-            with open(image_path, 'rb') as image_file:
-                return base64.b64encode(image_file.read()).decode('utf-8')
-        except Exception as e:
-            logger.error(f"Error encoding image {image_path}: {str(e)}")
-            return None
-    
-    def create_battery_analysis_prompt(self) -> str:
-        """建立電池分析提示詞"""
-        return """
+# 傳送給 Claude 前的縮圖上限與壓縮品質
+# vision token 數量與像素數成正比，縮圖可大幅降低延遲與成本
+# WebP 在同等品質下比 JPEG 小約 25–35%，可再減少傳輸量
+MAX_IMAGE_EDGE = 1024
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+
+# 以圖片內容雜湊快取的識別結果數量上限
+RESULT_CACHE_MAX_ENTRIES = 4096
+
+# 以 (路徑, mtime, 大小) 為 key 的編碼結果快取數量上限
+ENCODE_CACHE_MAX_ENTRIES = 64
+
+# 從 Claude 回應中提取 JSON：優先取 ```json 圍欄內容，否則取最外層大括號區段
+JSON_EXTRACT_PATTERN = re.compile(r'```json\s*(\{.*?\})\s*```|(\{.*\})', re.S)
+
+# 電池分析提示詞（內容固定，建為模組常數避免重複組字串）
+_BATTERY_ANALYSIS_PROMPT = """
 您是一個專業的電池品質檢查專家。請分析這張電池芯的照片，並提取以下資訊：
 
 1. Serial Number (序號) - 通常是類似 C044160 的格式
-2. Model (型號) - 通常是類似 6754E4 的格式  
+2. Model (型號) - 通常是類似 6754E4 的格式
 3. Energy (能量) - 以 Wh 為單位，例如 36.74Wh
 4. Capacity (容量) - 以 Ah 為單位，例如 10.8Ah
 5. Voltage (電壓) - 以 V 為單位，例如 3.40V
@@ -59,7 +61,7 @@ class ClaudeVisionService:
   "batteries": [
     {
       "serial_number": "C044160",
-      "model": "6754E4", 
+      "model": "6754E4",
       "energy": 36.74,
       "capacity": 10.8,
       "voltage": 3.40,
@@ -80,6 +82,118 @@ class ClaudeVisionService:
 
 請開始分析圖片：
 """
+
+def _compress_and_encode(image_bytes: bytes, image_format: str) -> str:
+    """縮圖並重新壓縮後編碼為 base64（PIL 無法處理時退回原始內容）"""
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            img.thumbnail((MAX_IMAGE_EDGE, MAX_IMAGE_EDGE), Image.LANCZOS)
+
+            buffer = io.BytesIO()
+            if image_format == 'webp':
+                img.convert('RGB').save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+            else:
+                img.convert('RGB').save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+            return base64.b64encode(buffer.getvalue()).decode('utf-8')
+    except (OSError, ValueError):
+        # PIL 無法處理時改用原始檔案內容
+        logger.warning("Cannot recompress image, sending raw bytes")
+        return base64.b64encode(image_bytes).decode('utf-8')
+
+@lru_cache(maxsize=ENCODE_CACHE_MAX_ENTRIES)
+def _encode_file_cached(image_path: str, mtime_ns: int, size: int, image_format: str) -> Optional[str]:
+    """以 (路徑, mtime, 大小) 為 key 快取檔案編碼結果，重試同一張圖片不需重新壓縮"""
+    try:
+        with open(image_path, 'rb') as image_file:
+            image_bytes = image_file.read()
+    except OSError:
+        return None
+    return _compress_and_encode(image_bytes, image_format)
+
+class ClaudeVisionService:
+    """
+    Anthropic Claude AI 圖片識別服務
+    用於識別電池芯的各項參數資訊
+    """
+    
+    def __init__(self):
+        self.api_key = config('ANTHROPIC_API_KEY', default='')
+        self.model = config('CLAUDE_MODEL', default='claude-3-5-sonnet-20241022')
+        self.batch_poll_interval = float(config('CLAUDE_BATCH_POLL_SECONDS', default=5) or 5)
+
+        # 上傳圖片使用的編碼格式（jpeg 或 webp）
+        self.image_format = (config('CLAUDE_IMAGE_FORMAT', default='jpeg') or 'jpeg').lower()
+        self.image_media_type = f"image/{self.image_format}"
+
+        # 以圖片內容雜湊為 key 的 LRU 結果快取，重複的圖片不需再次呼叫 API
+        self._result_cache: "OrderedDict[str, List[BatteryCellResponse]]" = OrderedDict()
+
+        # 提示詞內容固定，只建立一次；cache_control 讓 API 端重用提示詞的 KV 快取
+        self._prompt_block = {
+            "type": "text",
+            "text": self.create_battery_analysis_prompt(),
+            "cache_control": {"type": "ephemeral"}
+        }
+        
+        if self.api_key:
+            self.client = Anthropic(api_key=self.api_key)
+            logger.info("Claude Vision Service initialized with API key")
+        else:
+            self.client = None
+            logger.info("Claude Vision Service initialized without API key (will use fallback OCR)")
+    
+    def is_available(self) -> bool:
+        """檢查 Claude AI 服務是否可用"""
+        return self.client is not None and bool(self.api_key)
+    
+    def encode_image_to_base64(self, image_path: str, image_bytes: Optional[bytes] = None) -> Optional[str]:
+        """將圖片縮小並重新壓縮後編碼為 base64 格式"""
+        try:
+            if image_bytes is None:
+                # 依檔案路徑讀取時走快取路徑，檔案未變動就重用先前的編碼結果
+                try:
+                    stat = os.stat(image_path)
+                except OSError as e:
+                    logger.error(f"Error reading image {image_path}: {str(e)}")
+                    return None
+                return _encode_file_cached(image_path, stat.st_mtime_ns, stat.st_size, self.image_format)
+
+            return _compress_and_encode(image_bytes, self.image_format)
+        except Exception as e:
+            logger.error(f"Error encoding image {image_path}: {str(e)}")
+            return None
+    
+    def read_image_bytes(self, image_path: str) -> Optional[bytes]:
+        """讀取圖片檔案內容（雜湊與編碼共用同一次磁碟讀取）"""
+        try:
+            with open(image_path, 'rb') as image_file:
+                return image_file.read()
+        except Exception as e:
+            logger.error(f"Error reading image {image_path}: {str(e)}")
+            return None
+
+    def get_cached_result(self, content_hash: Optional[str]) -> Optional[List[BatteryCellResponse]]:
+        """取得快取的識別結果（回傳副本，避免呼叫端修改快取內容）"""
+        if not content_hash or content_hash not in self._result_cache:
+            return None
+
+        self._result_cache.move_to_end(content_hash)
+        return [battery.model_copy() for battery in self._result_cache[content_hash]]
+
+    def cache_result(self, content_hash: Optional[str], batteries: List[BatteryCellResponse]) -> None:
+        """快取識別結果並維持 LRU 上限"""
+        if not content_hash or not batteries:
+            return
+
+        self._result_cache[content_hash] = [battery.model_copy() for battery in batteries]
+        self._result_cache.move_to_end(content_hash)
+
+        while len(self._result_cache) > RESULT_CACHE_MAX_ENTRIES:
+            self._result_cache.popitem(last=False)
+
+    def create_battery_analysis_prompt(self) -> str:
+        """建立電池分析提示詞（回傳模組層級常數）"""
+        return _BATTERY_ANALYSIS_PROMPT
     
     async def analyze_battery_image(self, image_path: str, image_filename: str) -> List[BatteryCellResponse]:
         """
@@ -97,31 +211,40 @@ class ClaudeVisionService:
             return []
         
         try:
+            # 檔案只讀取一次，雜湊與編碼共用同一份緩衝
+            image_bytes = self.read_image_bytes(image_path)
+            if image_bytes is None:
+                return []
+
+            # 相同內容的圖片直接重用快取結果，省下一次 API 呼叫
+            content_hash = hashlib.sha256(image_bytes).hexdigest()
+            cached_batteries = self.get_cached_result(content_hash)
+            if cached_batteries is not None:
+                logger.info(f"Using cached Claude result for {image_filename}")
+                return cached_batteries
+
             # 編碼圖片
-            base64_image = self.encode_image_to_base64(image_path)
+            base64_image = self.encode_image_to_base64(image_path, image_bytes=image_bytes)
             if not base64_image:
                 return []
             
-            # 準備訊息
-            prompt = self.create_battery_analysis_prompt()
-            
-            # 調用 Claude API
-            message = self.client.messages.create(
+            # 調用 Claude API（提示詞區塊在 __init__ 建立一次後重用）
+            # Anthropic 客戶端是同步的，移到執行緒執行以免阻塞事件迴圈，
+            # 多張圖片的 gather 才能真正並發、逾時控制也才有機會生效
+            message = await asyncio.to_thread(
+                self.client.messages.create,
                 model=self.model,
                 max_tokens=4096,
                 messages=[
                     {
                         "role": "user",
                         "content": [
-                            {
-                                "type": "text",
-                                "text": prompt
-                            },
+                            self._prompt_block,
                             {
                                 "type": "image",
                                 "source": {
                                     "type": "base64",
-                                    "media_type": "image/jpeg",
+                                    "media_type": self.image_media_type,
                                     "data": base64_image
                                 }
                             }
@@ -136,7 +259,8 @@ class ClaudeVisionService:
             
             # 從回應中提取 JSON
             batteries = self.parse_claude_response(response_text, image_filename)
-            
+            self.cache_result(content_hash, batteries)
+
             logger.info(f"Claude AI identified {len(batteries)} batteries in {image_filename}")
             return batteries
             
@@ -144,6 +268,96 @@ class ClaudeVisionService:
             logger.error(f"Error analyzing image with Claude AI: {str(e)}")
             return []
     
+    async def analyze_batch(self, items: List[Tuple[str, str]]) -> Dict[str, List[BatteryCellResponse]]:
+        """
+        使用 Anthropic Message Batches API 批次分析多張電池圖片
+        適用於離線的大量圖片處理（成本較低、總吞吐量較高，但需等待批次完成）
+
+        Args:
+            items: (圖片檔案路徑, 圖片檔案名稱) 的列表
+
+        Returns:
+            以圖片檔案名稱為 key 的電池資料列表字典
+        """
+        if not self.is_available():
+            logger.warning("Claude AI service not available")
+            return {}
+
+        try:
+            # 建立批次請求（custom_id 只允許英數字，改用索引對應檔名）
+            requests = []
+            id_to_filename = {}
+
+            for i, (image_path, image_filename) in enumerate(items):
+                base64_image = self.encode_image_to_base64(image_path)
+                if not base64_image:
+                    continue
+
+                custom_id = f"image_{i}"
+                id_to_filename[custom_id] = image_filename
+                requests.append({
+                    "custom_id": custom_id,
+                    "params": {
+                        "model": self.model,
+                        "max_tokens": 4096,
+                        "messages": [
+                            {
+                                "role": "user",
+                                "content": [
+                                    self._prompt_block,
+                                    {
+                                        "type": "image",
+                                        "source": {
+                                            "type": "base64",
+                                            "media_type": self.image_media_type,
+                                            "data": base64_image
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    }
+                })
+
+            if not requests:
+                return {}
+
+            # 建立批次並輪詢直到完成（同步客戶端的呼叫一律移到執行緒，
+            # 輪詢等待期間事件迴圈可繼續服務其他請求）
+            batch = await asyncio.to_thread(
+                self.client.messages.batches.create, requests=requests
+            )
+            logger.info(f"Created Claude message batch {batch.id} with {len(requests)} requests")
+
+            while batch.processing_status != "ended":
+                await asyncio.sleep(self.batch_poll_interval)
+                batch = await asyncio.to_thread(
+                    self.client.messages.batches.retrieve, batch.id
+                )
+
+            # 讀取批次結果（results 會分頁抓取，整段消化也放進執行緒）
+            entries = await asyncio.to_thread(
+                lambda: list(self.client.messages.batches.results(batch.id))
+            )
+
+            results: Dict[str, List[BatteryCellResponse]] = {}
+            for entry in entries:
+                image_filename = id_to_filename.get(entry.custom_id, entry.custom_id)
+
+                if entry.result.type == "succeeded":
+                    response_text = entry.result.message.content[0].text
+                    results[image_filename] = self.parse_claude_response(response_text, image_filename)
+                else:
+                    logger.warning(f"Batch request for {image_filename} ended with {entry.result.type}")
+                    results[image_filename] = []
+
+            logger.info(f"Claude message batch {batch.id} completed for {len(results)} images")
+            return results
+
+        except Exception as e:
+            logger.error(f"Error analyzing image batch with Claude AI: {str(e)}")
+            return {}
+
     def parse_claude_response(self, response_text: str, image_filename: str) -> List[BatteryCellResponse]:
         """
         解析 Claude AI 的回應並轉換為電池資料物件
@@ -156,43 +370,24 @@ class ClaudeVisionService:
             電池資料物件列表
         """
         try:
-            # 嘗試從回應中提取 JSON
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
-            
-            if json_start == -1 or json_end == 0:
+            # 嘗試從回應中提取 JSON（單次掃描，同時處理 markdown 圍欄）
+            match = JSON_EXTRACT_PATTERN.search(response_text)
+            if not match:
                 logger.warning(f"No JSON found in Claude response for {image_filename}")
                 return []
-            
-            json_text = response_text[json_start:json_end]
-            
-            # 清理可能的 markdown 格式
-            if '```json' in response_text:
-                lines = response_text.split('\n')
-                json_lines = []
-                in_json = False
-                
-                for line in lines:
-                    if '```json' in line:
-                        in_json = True
-                        continue
-                    elif '```' in line and in_json:
-                        break
-                    elif in_json:
-                        json_lines.append(line)
-                
-                if json_lines:
-                    json_text = '\n'.join(json_lines)
-            
+
+            json_text = match.group(1) or match.group(2)
+
             # 解析 JSON
-            data = json.loads(json_text)
+            data = orjson.loads(json_text) if ORJSON_AVAILABLE else json.loads(json_text)
             
             batteries = []
             battery_list = data.get('batteries', [])
             
             for i, battery_data in enumerate(battery_list):
                 try:
-                    battery = BatteryCellResponse(
+                    # 欄位已在此處顯式轉型，model_construct 跳過重複的 pydantic 驗證
+                    battery = BatteryCellResponse.model_construct(
                         serial_number=battery_data.get('serial_number') or f"CLAUDE_UNKNOWN_{i+1}",
                         model=battery_data.get('model') or "UNKNOWN",
                         energy=float(battery_data.get('energy') or 0.0),
@@ -1,16 +1,67 @@
+import asyncio
+from operator import attrgetter
+
 from prisma import Prisma
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
 from models.battery import BatteryCellResponse, BatchProcessResponse
 
+# 啟動時預先建立的連接數（連接池大小由 DATABASE_URL 的 connection_limit 控制）
+POOL_WARMUP_CONNECTIONS = 5
+
+# Prisma 記錄欄位擷取器（一次呼叫取出整列，省去逐欄位的 getattr 查找）
+_BATTERY_GETTER = attrgetter(
+    'id', 'serialNumber', 'model', 'energy', 'capacity',
+    'voltage', 'imageFile', 'processedAt', 'createdAt', 'updatedAt'
+)
+_BATCH_GETTER = attrgetter('id', 'batchName', 'totalCells', 'processedAt', 'createdAt')
+
 class DatabaseService:
     def __init__(self):
         self.db = Prisma()
-    
+
+    @staticmethod
+    def _to_battery_response(battery) -> BatteryCellResponse:
+        """將 Prisma 電池記錄轉為回應模型（資料庫資料已受信任，跳過欄位驗證）"""
+        (record_id, serial_number, model, energy, capacity,
+         voltage, image_file, processed_at, created_at, updated_at) = _BATTERY_GETTER(battery)
+        return BatteryCellResponse.model_construct(
+            id=record_id,
+            serial_number=serial_number,
+            model=model,
+            energy=energy,
+            capacity=capacity,
+            voltage=voltage,
+            image_file=image_file,
+            processed_at=processed_at,
+            created_at=created_at,
+            updated_at=updated_at
+        )
+
+    @staticmethod
+    def _to_batch_response(batch) -> BatchProcessResponse:
+        """將 Prisma 批次記錄轉為回應模型（跳過欄位驗證）"""
+        record_id, batch_name, total_cells, processed_at, created_at = _BATCH_GETTER(batch)
+        return BatchProcessResponse.model_construct(
+            id=record_id,
+            batch_name=batch_name,
+            total_cells=total_cells,
+            processed_at=processed_at,
+            created_at=created_at
+        )
+
     async def connect(self):
-        """連接資料庫"""
+        """連接資料庫並預熱連接池"""
         await self.db.connect()
+
+        # 以並發查詢預先建立連接，避免首波流量付出握手成本
+        try:
+            await asyncio.gather(
+                *(self.db.query_raw('SELECT 1') for _ in range(POOL_WARMUP_CONNECTIONS))
+            )
+        except Exception as e:
+            print(f"Error warming up connection pool: {str(e)}")
     
     async def disconnect(self):
         """斷開資料庫連接"""
@@ -30,22 +81,43 @@ class DatabaseService:
                 }
             )
             
-            return BatteryCellResponse(
-                id=battery.id,
-                serial_number=battery.serialNumber,
-                model=battery.model,
-                energy=battery.energy,
-                capacity=battery.capacity,
-                voltage=battery.voltage,
-                image_file=battery.imageFile,
-                processed_at=battery.processedAt,
-                created_at=battery.createdAt,
-                updated_at=battery.updatedAt
-            )
+            return self._to_battery_response(battery)
         except Exception as e:
             print(f"Error saving battery: {str(e)}")
             raise
     
+    async def save_batteries_bulk(self, batteries_data: List[Dict[str, Any]], batch_name: str) -> int:
+        """批次儲存電池資料（單一交易內以 create_many 一次寫入）"""
+        try:
+            rows = [
+                {
+                    'serialNumber': battery_data['serial_number'],
+                    'model': battery_data['model'],
+                    'energy': battery_data['energy'],
+                    'capacity': battery_data['capacity'],
+                    'voltage': battery_data['voltage'],
+                    'imageFile': battery_data.get('image_file', ''),
+                }
+                for battery_data in batteries_data
+            ]
+
+            async with self.db.tx() as tx:
+                created_count = await tx.batterycell.create_many(
+                    data=rows,
+                    skip_duplicates=False
+                )
+                await tx.batchprocess.create(
+                    data={
+                        'batchName': batch_name,
+                        'totalCells': created_count,
+                    }
+                )
+
+            return created_count
+        except Exception as e:
+            print(f"Error saving batteries in bulk: {str(e)}")
+            raise
+
     async def save_batch_process(self, batch_name: str, total_cells: int) -> BatchProcessResponse:
         """儲存批次處理記錄"""
         try:
@@ -56,13 +128,7 @@ class DatabaseService:
                 }
             )
             
-            return BatchProcessResponse(
-                id=batch.id,
-                batch_name=batch.batchName,
-                total_cells=batch.totalCells,
-                processed_at=batch.processedAt,
-                created_at=batch.createdAt
-            )
+            return self._to_batch_response(batch)
         except Exception as e:
             print(f"Error saving batch process: {str(e)}")
             raise
@@ -76,21 +142,8 @@ class DatabaseService:
                 order={'createdAt': 'desc'}
             )
             
-            return [
-                BatteryCellResponse(
-                    id=battery.id,
-                    serial_number=battery.serialNumber,
-                    model=battery.model,
-                    energy=battery.energy,
-                    capacity=battery.capacity,
-                    voltage=battery.voltage,
-                    image_file=battery.imageFile,
-                    processed_at=battery.processedAt,
-                    created_at=battery.createdAt,
-                    updated_at=battery.updatedAt
-                )
-                for battery in batteries
-            ]
+            # map 直接在 C 層迭代，省去逐列的 bytecode 分派
+            return list(map(self._to_battery_response, batteries))
         except Exception as e:
             print(f"Error retrieving batteries: {str(e)}")
             raise
@@ -105,18 +158,7 @@ class DatabaseService:
             if not battery:
                 return None
             
-            return BatteryCellResponse(
-                id=battery.id,
-                serial_number=battery.serialNumber,
-                model=battery.model,
-                energy=battery.energy,
-                capacity=battery.capacity,
-                voltage=battery.voltage,
-                image_file=battery.imageFile,
-                processed_at=battery.processedAt,
-                created_at=battery.createdAt,
-                updated_at=battery.updatedAt
-            )
+            return self._to_battery_response(battery)
         except Exception as e:
             print(f"Error retrieving battery by ID: {str(e)}")
             raise
@@ -128,16 +170,7 @@ class DatabaseService:
                 order={'createdAt': 'desc'}
             )
             
-            return [
-                BatchProcessResponse(
-                    id=batch.id,
-                    batch_name=batch.batchName,
-                    total_cells=batch.totalCells,
-                    processed_at=batch.processedAt,
-                    created_at=batch.createdAt
-                )
-                for batch in batches
-            ]
+            return list(map(self._to_batch_response, batches))
         except Exception as e:
             print(f"Error retrieving batch processes: {str(e)}")
             raise
@@ -168,18 +201,7 @@ class DatabaseService:
                 }
             )
             
-            return BatteryCellResponse(
-                id=battery.id,
-                serial_number=battery.serialNumber,
-                model=battery.model,
-                energy=battery.energy,
-                capacity=battery.capacity,
-                voltage=battery.voltage,
-                image_file=battery.imageFile,
-                processed_at=battery.processedAt,
-                created_at=battery.createdAt,
-                updated_at=battery.updatedAt
-            )
+            return self._to_battery_response(battery)
         except Exception as e:
             print(f"Error updating battery: {str(e)}")
             raise
\ No newline at end of file
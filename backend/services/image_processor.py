@@ -1,18 +1,48 @@
+import asyncio
 import cv2
 import pytesseract
 from PIL import Image
 import numpy as np
 import re
+import threading
 from typing import List, Optional, Dict
 import os
 import logging
 from decouple import config
 
+# tesserocr 讓 Tesseract 引擎常駐於行程內，省去每張圖片的 fork/exec 成本
+# 未安裝時改用 pytesseract subprocess
+try:
+    import tesserocr
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    tesserocr = None
+    TESSEROCR_AVAILABLE = False
+
 from models.battery import BatteryCellResponse
 from services.claude_vision_service import ClaudeVisionService
 
 logger = logging.getLogger(__name__)
 
+# OCR 文字解析用的欄位與正規表達式（模組載入時編譯一次）
+# 五種樣式合併為單一 alternation，整段文字只需掃描一次
+BATTERY_INFO_FIELDS = ('serial_number', 'model', 'energy', 'capacity', 'voltage')
+BATTERY_INFO_SCANNER = re.compile(
+    r'(?P<serial_number>[A-Z]\d{6})'   # Format like C044160
+    r'|(?P<model>\d{4}[A-Z]\d)'        # Format like 6754E4
+    r'|(?P<energy>\d+\.?\d*)\s*Wh'     # Format like 36.74Wh
+    r'|(?P<capacity>\d+\.?\d*)\s*Ah'   # Format like 10.8Ah
+    r'|(?P<voltage>\d+\.?\d*)\s*V',    # Format like 3.40V
+    re.IGNORECASE | re.ASCII,          # OCR 輸出只含 ASCII，跳過 Unicode 類別表
+)
+
+# 電池標籤只會出現的字元集合；白名單大幅縮小 LSTM 引擎的搜尋空間
+_TESS_WHITELIST = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789.:/h '
+_TESS_CONFIG = f'--oem 1 --psm 6 -c tessedit_char_whitelist={_TESS_WHITELIST}'
+
+# 批次補跑單張流程時的並發上限
+FALLBACK_CONCURRENCY = 4
+
 class ImageProcessor:
     def __init__(self):
         # Configure Tesseract path if needed
@@ -22,8 +52,23 @@ class ImageProcessor:
         
         # Initialize Claude Vision Service
         self.claude_service = ClaudeVisionService()
-        
-        logger.info(f"ImageProcessor initialized - Claude AI available: {self.claude_service.is_available()}")
+
+        # 單張圖片 Claude 呼叫的逾時秒數，逾時改走 OCR，避免單一慢請求拖垮整批
+        self.claude_timeout = float(config('CLAUDE_TIMEOUT', default=30) or 30)
+
+        # 優先使用常駐的 tesserocr 引擎（單一 API 實例需以鎖保護）
+        self._tess_api = None
+        self._tess_lock = threading.Lock()
+        if TESSEROCR_AVAILABLE:
+            try:
+                self._tess_api = tesserocr.PyTessBaseAPI(psm=tesserocr.PSM.SINGLE_BLOCK)
+                self._tess_api.SetVariable('tessedit_char_whitelist', _TESS_WHITELIST)
+            except Exception as e:
+                logger.warning(f"Cannot initialize tesserocr, falling back to pytesseract: {str(e)}")
+                self._tess_api = None
+
+        logger.info(f"ImageProcessor initialized - Claude AI available: {self.claude_service.is_available()}, "
+                    f"in-process OCR: {self._tess_api is not None}")
     
     async def process_image(self, image_path: str) -> List[BatteryCellResponse]:
         """
@@ -33,11 +78,19 @@ class ImageProcessor:
         image_filename = os.path.basename(image_path)
         
         try:
-            # 優先使用 Claude AI 進行圖片識別
+            # 優先使用 Claude AI 進行圖片識別（逾時即放棄並改走 OCR）
             if self.claude_service.is_available():
                 logger.info(f"Using Claude AI to analyze {image_filename}")
-                batteries = await self.claude_service.analyze_battery_image(image_path, image_filename)
-                
+                try:
+                    batteries = await asyncio.wait_for(
+                        self.claude_service.analyze_battery_image(image_path, image_filename),
+                        timeout=self.claude_timeout
+                    )
+                except asyncio.TimeoutError:
+                    logger.warning(f"Claude AI timed out after {self.claude_timeout}s for {image_filename}, "
+                                   f"falling back to OCR")
+                    batteries = []
+
                 if batteries:
                     logger.info(f"Claude AI successfully identified {len(batteries)} batteries in {image_filename}")
                     # 為每個電池添加識別方法標記
@@ -56,20 +109,76 @@ class ImageProcessor:
             logger.error(f"Error processing image {image_path}: {str(e)}")
             return []
     
+    async def process_images_bulk(self, image_paths: List[str]) -> Dict[str, List[BatteryCellResponse]]:
+        """
+        批次處理多張圖片
+        優先使用 Claude Message Batches API，沒有結果的圖片改用單張流程處理
+        """
+        items = [(image_path, os.path.basename(image_path)) for image_path in image_paths]
+        results: Dict[str, List[BatteryCellResponse]] = {}
+
+        if self.claude_service.is_available():
+            logger.info(f"Using Claude message batch to analyze {len(items)} images")
+            results = await self.claude_service.analyze_batch(items)
+
+            # 為每個電池添加識別方法標記
+            for batteries in results.values():
+                for battery in batteries:
+                    if hasattr(battery, 'recognition_method'):
+                        battery.recognition_method = "Claude AI"
+
+        # 批次中失敗或遺漏的圖片改用單張流程（含 OCR 備用），以有界並發補跑
+        pending = [item for item in items if not results.get(item[1])]
+        if pending:
+            semaphore = asyncio.Semaphore(FALLBACK_CONCURRENCY)
+
+            async def process_with_limit(image_path: str) -> List[BatteryCellResponse]:
+                async with semaphore:
+                    return await self.process_image(image_path)
+
+            fallback_results = await asyncio.gather(
+                *(process_with_limit(image_path) for image_path, _ in pending)
+            )
+            for (_, image_filename), batteries in zip(pending, fallback_results):
+                results[image_filename] = batteries
+
+        return results
+
     async def process_image_with_ocr(self, image_path: str) -> List[BatteryCellResponse]:
-        """使用傳統 OCR 方法處理圖片"""
+        """
+        使用傳統 OCR 方法處理圖片
+        OpenCV 與 Tesseract 為 CPU 密集操作，移到執行緒池避免阻塞事件迴圈
+        """
+        return await asyncio.to_thread(self._process_image_with_ocr_sync, image_path)
+
+    def _load_image_bytes(self, image_path: str) -> Optional[bytes]:
+        """讀取圖片檔案內容（每張圖片只從磁碟讀取一次，解碼直接使用同一份緩衝）"""
+        try:
+            with open(image_path, 'rb') as image_file:
+                return image_file.read()
+        except Exception as e:
+            logger.error(f"Error reading image file {image_path}: {str(e)}")
+            return None
+
+    def _process_image_with_ocr_sync(self, image_path: str) -> List[BatteryCellResponse]:
+        """OCR 處理流程的同步實作（在執行緒池中執行）"""
         image_filename = os.path.basename(image_path)
-        
+
         try:
             # Load and preprocess image
-            image = cv2.imread(image_path)
-            if image is None:
+            image_data = self._load_image_bytes(image_path)
+            if image_data is None:
                 raise ValueError(f"Cannot load image: {image_path}")
+
+            # 解碼時直接輸出半解析度灰階：libjpeg 在 IDCT 階段完成縮小與去彩，少搬 4 倍像素
+            image = cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_2)
+            if image is None:
+                raise ValueError(f"Cannot decode image: {image_path}")
             
             processed_image = self.preprocess_image(image)
             
             # Extract text using OCR
-            text = pytesseract.image_to_string(processed_image, config='--psm 6')
+            text = self.ocr_image_to_string(processed_image)
             logger.debug(f"OCR extracted text from {image_filename}: {text[:100]}...")
             
             # Extract battery information from text
@@ -87,40 +196,41 @@ class ImageProcessor:
             logger.error(f"Error processing image with OCR {image_path}: {str(e)}")
             return []
     
+    def ocr_image_to_string(self, processed_image: np.ndarray) -> str:
+        """對預處理後的圖片執行 OCR 文字辨識"""
+        if self._tess_api is not None:
+            with self._tess_lock:
+                self._tess_api.SetImage(Image.fromarray(processed_image))
+                return self._tess_api.GetUTF8Text()
+
+        return pytesseract.image_to_string(processed_image, lang='eng', config=_TESS_CONFIG)
+
     def preprocess_image(self, image: np.ndarray) -> np.ndarray:
         """預處理圖片以提高OCR準確率"""
-        # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        
+        # Convert to grayscale（解碼器已輸出灰階時跳過轉換）
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+        # 超大圖片先縮小一半，CLAHE 與 Otsu 閾值的工作量隨像素數線性下降
+        if max(gray.shape) > 1500:
+            gray = cv2.resize(gray, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA)
+
         # Apply CLAHE (Contrast Limited Adaptive Histogram Equalization)
         clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
         enhanced = clahe.apply(gray)
-        
-        # Gaussian blur to reduce noise
-        blurred = cv2.GaussianBlur(enhanced, (1, 1), 0)
-        
+
         # Threshold to get better text contrast
-        _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        
+        _, thresh = cv2.threshold(enhanced, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
         return thresh
     
     def extract_battery_info(self, text: str, image_file: str) -> List[BatteryCellResponse]:
         """從OCR文字中提取電池資訊"""
         batteries = []
-        
-        # Regular expressions for extracting battery information
-        patterns = {
-            'serial_number': r'([A-Z]\d{6})',  # Format like C044160
-            'model': r'(\d{4}[A-Z]\d)',       # Format like 6754E4
-            'energy': r'(\d+\.?\d*)\s*Wh',    # Format like 36.74Wh
-            'capacity': r'(\d+\.?\d*)\s*Ah',  # Format like 10.8Ah
-            'voltage': r'(\d+\.?\d*)\s*V'     # Format like 3.40V
-        }
-        
-        # Find all matches for each pattern
-        matches = {}
-        for key, pattern in patterns.items():
-            matches[key] = re.findall(pattern, text, re.IGNORECASE)
+
+        # Collect matches for all fields in a single pass over the text
+        matches = {key: [] for key in BATTERY_INFO_FIELDS}
+        for match in BATTERY_INFO_SCANNER.finditer(text):
+            matches[match.lastgroup].append(match.group(match.lastgroup))
         
         # Determine the number of batteries (use the maximum count from any field)
         max_count = max(len(matches[key]) for key in matches)
@@ -128,7 +238,8 @@ class ImageProcessor:
         # Create battery objects
         for i in range(max_count):
             try:
-                battery = BatteryCellResponse(
+                # 欄位已在此處顯式轉型，model_construct 跳過重複的 pydantic 驗證
+                battery = BatteryCellResponse.model_construct(
                     serial_number=matches['serial_number'][i] if i < len(matches['serial_number']) else f"UNKNOWN_{i+1}",
                     model=matches['model'][i] if i < len(matches['model']) else "UNKNOWN",
                     energy=float(matches['energy'][i]) if i < len(matches['energy']) else 0.0,
@@ -150,22 +261,20 @@ class ImageProcessor:
         
         # Simple approach: divide image into grid regions
         height, width = image.shape[:2]
-        regions = []
-        
+
         # Assume batteries are arranged in a grid pattern
         rows, cols = 2, 4  # Adjustable based on typical layouts
-        
-        for row in range(rows):
-            for col in range(cols):
-                y1 = (height // rows) * row
-                y2 = (height // rows) * (row + 1)
-                x1 = (width // cols) * col
-                x2 = (width // cols) * (col + 1)
-                
-                region = image[y1:y2, x1:x2]
-                regions.append(region)
-        
-        return regions
+        tile_height = height // rows
+        tile_width = width // cols
+
+        # 以 strided view 一次切出所有區域（零複製，純 view）
+        tiles = np.lib.stride_tricks.as_strided(
+            image,
+            shape=(rows, cols, tile_height, tile_width) + image.shape[2:],
+            strides=(image.strides[0] * tile_height, image.strides[1] * tile_width) + image.strides,
+        )
+
+        return [tiles[row, col] for row in range(rows) for col in range(cols)]
     
     def get_recognition_status(self) -> Dict:
         """取得圖片識別服務狀態"""
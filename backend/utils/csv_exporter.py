@@ -1,111 +1,271 @@
+import csv
+import io
+import numpy as np
 import pandas as pd
 import os
+from collections import Counter
+from operator import attrgetter
 from typing import List
 from datetime import datetime
 
 from models.battery import BatteryCellResponse
 
+# Polars 的 write_csv 為多執行緒實作，中型以上的資料量比 pandas to_csv 快數倍
+# 未安裝時改用 pandas
+try:
+    import polars as pl
+    POLARS_AVAILABLE = True
+except ImportError:
+    pl = None
+    POLARS_AVAILABLE = False
+
+# 欄位值擷取器（整列一次取出，逐欄建表比逐列建 dict 少一個數量級的配置）
+_SUMMARY_GETTER = attrgetter(
+    'serial_number', 'model', 'energy', 'capacity', 'voltage', 'image_file'
+)
+
+# 日期輸出格式
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# 綁定一次的格式化函式（省去逐列的屬性查找）
+_strftime = datetime.strftime
+
+# 寫檔緩衝區大小：1 MiB 一次寫出，減少小型 write 系統呼叫
+# （網路檔案系統或容器掛載磁碟上差異最明顯）
+CSV_WRITE_BUFFER_SIZE = 1 << 20
+
 class CSVExporter:
+    # 匯出欄位順序（檔案匯出與串流匯出共用）
+    EXPORT_COLUMNS = (
+        'ID', 'Serial Number', 'Model', 'Energy (Wh)', 'Capacity (Ah)',
+        'Voltage (V)', 'Image File', 'Processed At', 'Created At', 'Updated At'
+    )
+
+    # 已建立過的輸出目錄（同目錄重複建構實例時不再重複 stat/mkdir）
+    _created_dirs = set()
+
     def __init__(self, output_dir: str = "exports"):
         self.output_dir = output_dir
         # Create output directory if it doesn't exist
-        os.makedirs(output_dir, exist_ok=True)
-    
-    def export_batteries(self, batteries: List[BatteryCellResponse]) -> str:
-        """將電池資料匯出為 CSV 檔案"""
+        if output_dir not in CSVExporter._created_dirs:
+            os.makedirs(output_dir, exist_ok=True)
+            CSVExporter._created_dirs.add(output_dir)
+
+    @staticmethod
+    def battery_row(battery: BatteryCellResponse) -> list:
+        """將單筆電池資料轉為 CSV 列（順序對應 EXPORT_COLUMNS）"""
+        return [
+            battery.id,
+            battery.serial_number,
+            battery.model,
+            battery.energy,
+            battery.capacity,
+            battery.voltage,
+            battery.image_file,
+            battery.processed_at.strftime(DATETIME_FORMAT) if battery.processed_at else '',
+            battery.created_at.strftime(DATETIME_FORMAT) if battery.created_at else '',
+            battery.updated_at.strftime(DATETIME_FORMAT) if battery.updated_at else ''
+        ]
+
+    def export_batteries(self, batteries: List[BatteryCellResponse], output_format: str = 'csv') -> str:
+        """
+        將電池資料匯出為檔案
+        預設為 CSV；parquet 與 feather 為欄式二進位格式（檔案較小、重新讀取較快，需安裝 pyarrow）
+        """
         try:
-            # Convert battery data to DataFrame
-            data = []
-            for battery in batteries:
-                data.append({
-                    'ID': battery.id,
-                    'Serial Number': battery.serial_number,
-                    'Model': battery.model,
-                    'Energy (Wh)': battery.energy,
-                    'Capacity (Ah)': battery.capacity,
-                    'Voltage (V)': battery.voltage,
-                    'Image File': battery.image_file,
-                    'Processed At': battery.processed_at.strftime('%Y-%m-%d %H:%M:%S') if battery.processed_at else '',
-                    'Created At': battery.created_at.strftime('%Y-%m-%d %H:%M:%S') if battery.created_at else '',
-                    'Updated At': battery.updated_at.strftime('%Y-%m-%d %H:%M:%S') if battery.updated_at else ''
-                })
-            
-            df = pd.DataFrame(data)
-            
             # Generate filename with timestamp
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"battery_data_{timestamp}.csv"
+            filename = f"battery_data_{timestamp}.{output_format}"
             filepath = os.path.join(self.output_dir, filename)
-            
-            # Export to CSV
-            df.to_csv(filepath, index=False, encoding='utf-8-sig')
-            
+
+            # CSV 快路徑：csv.writer 直接逐列序列化，完全略過 DataFrame 建構
+            if output_format == 'csv' and not POLARS_AVAILABLE:
+                with open(filepath, 'w', encoding='utf-8-sig', newline='',
+                          buffering=CSV_WRITE_BUFFER_SIZE) as csv_file:
+                    writer = csv.writer(csv_file)
+                    writer.writerow(self.EXPORT_COLUMNS)
+                    writer.writerows(
+                        [
+                            battery.id,
+                            battery.serial_number,
+                            battery.model,
+                            # 預先格式化數值欄位，跳過逐格型別判斷
+                            f'{float(battery.energy):.4f}',
+                            f'{float(battery.capacity):.4f}',
+                            f'{float(battery.voltage):.4f}',
+                            battery.image_file,
+                            battery.processed_at.strftime(DATETIME_FORMAT) if battery.processed_at else '',
+                            battery.created_at.strftime(DATETIME_FORMAT) if battery.created_at else '',
+                            battery.updated_at.strftime(DATETIME_FORMAT) if battery.updated_at else ''
+                        ]
+                        for battery in batteries
+                    )
+                return filepath
+
+            # 逐欄建表：數值欄位直接寫進連續的型別化緩衝，不經過逐列 tuple/dict
+            count = len(batteries)
+            df = pd.DataFrame({
+                'ID': np.fromiter((b.id for b in batteries), dtype=np.int64, count=count),
+                'Serial Number': [b.serial_number for b in batteries],
+                'Model': [b.model for b in batteries],
+                'Energy (Wh)': np.fromiter((b.energy for b in batteries), dtype=np.float64, count=count),
+                'Capacity (Ah)': np.fromiter((b.capacity for b in batteries), dtype=np.float64, count=count),
+                'Voltage (V)': np.fromiter((b.voltage for b in batteries), dtype=np.float64, count=count),
+                'Image File': [b.image_file for b in batteries],
+                # 日期欄位直接格式化為字串，不經過 to_datetime 的解析往返
+                'Processed At': ['' if b.processed_at is None else _strftime(b.processed_at, DATETIME_FORMAT) for b in batteries],
+                'Created At': ['' if b.created_at is None else _strftime(b.created_at, DATETIME_FORMAT) for b in batteries],
+                'Updated At': ['' if b.updated_at is None else _strftime(b.updated_at, DATETIME_FORMAT) for b in batteries],
+            })
+
+            if output_format == 'csv':
+                # 先寫 BOM 保留 utf-8-sig 語意，再由 Polars 平行序列化
+                with open(filepath, 'wb', buffering=CSV_WRITE_BUFFER_SIZE) as csv_file:
+                    csv_file.write(b'\xef\xbb\xbf')
+                    pl.from_pandas(df).write_csv(csv_file)
+            elif output_format == 'parquet':
+                df.to_parquet(filepath, engine='pyarrow', compression='snappy')
+            elif output_format == 'feather':
+                df.to_feather(filepath)
+            else:
+                raise ValueError(f"Unsupported output format: {output_format}")
+
             return filepath
         except Exception as e:
-            print(f"Error exporting batteries to CSV: {str(e)}")
+            print(f"Error exporting batteries to {output_format}: {str(e)}")
             raise
     
     def export_summary_report(self, batteries: List[BatteryCellResponse]) -> str:
         """匯出電池資料摘要報告"""
         try:
-            # Convert to DataFrame for analysis
-            data = []
-            for battery in batteries:
-                data.append({
-                    'Serial Number': battery.serial_number,
-                    'Model': battery.model,
-                    'Energy': battery.energy,
-                    'Capacity': battery.capacity,
-                    'Voltage': battery.voltage,
-                    'Image File': battery.image_file
-                })
-            
-            df = pd.DataFrame(data)
-            
-            # Create summary statistics
+            # Convert to DataFrame for analysis（擷取器 tuple 列直接建表）
+            summary_columns = ('Serial Number', 'Model', 'Energy', 'Capacity', 'Voltage', 'Image File')
+            rows = list(map(_SUMMARY_GETTER, batteries))
+
+            # Polars 可用時改走延遲運算路徑：聚合一次掃描、各區塊逐批寫出
+            if POLARS_AVAILABLE and batteries:
+                columns = list(zip(*rows))
+                return self._export_summary_report_polars(dict(zip(summary_columns, columns)), len(batteries))
+
+            # Create summary statistics（數值欄位轉為連續陣列，reductions 走向量化 C 路徑）
+            n = len(batteries)
+            energy = np.fromiter((row[2] for row in rows), np.float64, count=n)
+            capacity = np.fromiter((row[3] for row in rows), np.float64, count=n)
+            voltage = np.fromiter((row[4] for row in rows), np.float64, count=n)
+
+            # Model distribution（Counter 單次掃描，省去 value_counts 的排序與中間 DataFrame）
+            model_counts = Counter(row[1] for row in rows)
+
             summary_data = {
-                'Total Batteries': len(batteries),
-                'Unique Models': df['Model'].nunique(),
-                'Average Energy (Wh)': df['Energy'].mean(),
-                'Average Capacity (Ah)': df['Capacity'].mean(),
-                'Average Voltage (V)': df['Voltage'].mean(),
-                'Energy Range': f"{df['Energy'].min():.2f} - {df['Energy'].max():.2f} Wh",
-                'Capacity Range': f"{df['Capacity'].min():.2f} - {df['Capacity'].max():.2f} Ah",
-                'Voltage Range': f"{df['Voltage'].min():.2f} - {df['Voltage'].max():.2f} V"
+                'Total Batteries': n,
+                'Unique Models': len(model_counts),
+                # 預先格式化浮點數值，csv.writer 只需處理字串
+                'Average Energy (Wh)': f"{energy.mean():.2f}",
+                'Average Capacity (Ah)': f"{capacity.mean():.2f}",
+                'Average Voltage (V)': f"{voltage.mean():.2f}",
+                'Energy Range': f"{energy.min():.2f} - {energy.max():.2f} Wh",
+                'Capacity Range': f"{capacity.min():.2f} - {capacity.max():.2f} Ah",
+                'Voltage Range': f"{voltage.min():.2f} - {voltage.max():.2f} V"
             }
-            
-            # Create summary DataFrame
-            summary_df = pd.DataFrame(list(summary_data.items()), columns=['Metric', 'Value'])
-            
-            # Model distribution
-            model_dist = df['Model'].value_counts().reset_index()
-            model_dist.columns = ['Model', 'Count']
-            
+
+            model_dist = model_counts.most_common()
+
             # Generate filename
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f"battery_summary_{timestamp}.csv"
             filepath = os.path.join(self.output_dir, filename)
-            
+
             # Write to CSV with multiple sheets simulation
-            with open(filepath, 'w', encoding='utf-8-sig') as f:
-                f.write("電池資料摘要報告\n")
-                f.write("=" * 50 + "\n\n")
-                
-                # Write summary statistics
-                f.write("摘要統計\n")
-                summary_df.to_csv(f, index=False)
-                f.write("\n\n")
-                
-                # Write model distribution
-                f.write("型號分布\n")
-                model_dist.to_csv(f, index=False)
-                f.write("\n\n")
-                
-                # Write detailed data
-                f.write("詳細資料\n")
-                df.to_csv(f, index=False)
-            
+            # 整份報告先在記憶體中組好，最後一次寫出（單一 write 系統呼叫）
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            buffer.write("電池資料摘要報告\n")
+            buffer.write("=" * 50 + "\n\n")
+
+            # Write summary statistics
+            buffer.write("摘要統計\n")
+            writer.writerow(['Metric', 'Value'])
+            writer.writerows(summary_data.items())
+            buffer.write("\n\n")
+
+            # Write model distribution
+            buffer.write("型號分布\n")
+            writer.writerow(['Model', 'Count'])
+            writer.writerows(model_dist)
+            buffer.write("\n\n")
+
+            # Write detailed data
+            buffer.write("詳細資料\n")
+            writer.writerow(summary_columns)
+            writer.writerows(rows)
+
+            with open(filepath, 'w', encoding='utf-8-sig', newline='') as f:
+                f.write(buffer.getvalue())
+
             return filepath
         except Exception as e:
             print(f"Error exporting summary report: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    def _export_summary_report_polars(self, data: dict, total_batteries: int) -> str:
+        """以 Polars LazyFrame 產生摘要報告（輸出格式與 pandas 路徑相同）"""
+        lf = pl.LazyFrame(data)
+
+        # 所有聚合合併為單次掃描
+        stats = lf.select(
+            pl.col('Model').n_unique().alias('unique_models'),
+            pl.col('Energy').mean().alias('avg_energy'),
+            pl.col('Capacity').mean().alias('avg_capacity'),
+            pl.col('Voltage').mean().alias('avg_voltage'),
+            pl.col('Energy').min().alias('min_energy'),
+            pl.col('Energy').max().alias('max_energy'),
+            pl.col('Capacity').min().alias('min_capacity'),
+            pl.col('Capacity').max().alias('max_capacity'),
+            pl.col('Voltage').min().alias('min_voltage'),
+            pl.col('Voltage').max().alias('max_voltage'),
+        ).collect().row(0, named=True)
+
+        summary_data = {
+            'Total Batteries': total_batteries,
+            'Unique Models': stats['unique_models'],
+            'Average Energy (Wh)': f"{stats['avg_energy']:.2f}",
+            'Average Capacity (Ah)': f"{stats['avg_capacity']:.2f}",
+            'Average Voltage (V)': f"{stats['avg_voltage']:.2f}",
+            'Energy Range': f"{stats['min_energy']:.2f} - {stats['max_energy']:.2f} Wh",
+            'Capacity Range': f"{stats['min_capacity']:.2f} - {stats['max_capacity']:.2f} Ah",
+            'Voltage Range': f"{stats['min_voltage']:.2f} - {stats['max_voltage']:.2f} V"
+        }
+        summary_df = pl.DataFrame({
+            'Metric': list(summary_data.keys()),
+            'Value': [str(value) for value in summary_data.values()]
+        })
+
+        model_dist = (
+            lf.group_by('Model')
+            .len(name='Count')
+            .sort('Count', descending=True)
+            .collect()
+        )
+
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = f"battery_summary_{timestamp}.csv"
+        filepath = os.path.join(self.output_dir, filename)
+
+        # 各區塊循序寫入同一檔案（BOM 保留 utf-8-sig 語意）
+        with open(filepath, 'wb') as f:
+            f.write(b'\xef\xbb\xbf')
+            f.write('電池資料摘要報告\n'.encode('utf-8'))
+            f.write(('=' * 50 + '\n\n').encode('utf-8'))
+
+            f.write('摘要統計\n'.encode('utf-8'))
+            summary_df.write_csv(f)
+            f.write(b'\n\n')
+
+            f.write('型號分布\n'.encode('utf-8'))
+            model_dist.write_csv(f)
+            f.write(b'\n\n')
+
+            f.write('詳細資料\n'.encode('utf-8'))
+            lf.collect().write_csv(f)
+
+        return filepath
\ No newline at end of file
@@ -4,13 +4,25 @@
 專門測試真實照片的識別準確性和完整性
 """
 
+import re
 import subprocess
 import sys
 import os
+import xml.etree.ElementTree as ET
+from importlib.metadata import distribution, PackageNotFoundError
 from pathlib import Path
 import json
 from datetime import datetime
 
+# orjson（Rust 實作）序列化大型報告比標準函式庫快一個數量級
+# 未安裝時改用標準 json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
 class Colors:
     GREEN = '\033[92m'
     YELLOW = '\033[93m'
@@ -20,9 +32,12 @@ class Colors:
     ENDC = '\033[0m'
     BOLD = '\033[1m'
 
+# 重設碼與換行預先合併，逐行輸出時不再做字串串接
+_COLOR_RESET = Colors.ENDC + '\n'
+
 def print_colored(message, color=Colors.ENDC):
-    """印出彩色訊息"""
-    print(f"{color}{message}{Colors.ENDC}")
+    """印出彩色訊息（writelines 單次緩衝寫出，不經過格式化與串接）"""
+    sys.stdout.writelines((color, message, _COLOR_RESET))
 
 def print_banner():
     """印出測試橫幅"""
@@ -61,8 +76,12 @@ def check_test_environment():
         print_colored(f"⚠️  缺少測試圖片: {', '.join(missing_images)}", Colors.YELLOW)
         print_colored("   測試將會跳過缺少的圖片", Colors.YELLOW)
     
-    # 檢查所有圖片
-    image_files = list(data_path.glob("*.jpg")) + list(data_path.glob("*.jpeg")) + list(data_path.glob("*.png"))
+    # 檢查所有圖片（單次 scandir 掃描即可過濾三種副檔名）
+    with os.scandir(data_path) as entries:
+        image_files = [
+            entry.name for entry in entries
+            if entry.is_file() and entry.name.lower().endswith(('.jpg', '.jpeg', '.png'))
+        ]
     print_colored(f"✅ 找到 {len(image_files)} 個圖片檔案", Colors.GREEN)
     
     # 檢查後端依賴
@@ -77,97 +96,137 @@ def check_test_environment():
     
     return True
 
+# 測試群組定義（報告與建議沿用這些名稱）
+TEST_GROUPS = [
+    ('真實圖片識別測試', '測試特定圖片的識別準確性'),
+    ('識別方法比較測試', '比較 Claude AI 和傳統 OCR 效果'),
+    ('批次識別測試', '測試所有圖片的基本識別能力'),
+    ('識別一致性測試', '測試識別結果的穩定性和一致性'),
+]
+
+# 測試輸出重點標示：單一編譯好的 alternation，一行只掃描一次
+HIGHLIGHT_PATTERN = re.compile(
+    r'(?P<header>===.*(?:識別結果|測試)|(?:識別結果|測試).*===)'
+    r'|(?P<accuracy>完美匹配|良好匹配|準確率)'
+    r'|(?P<summary>總結:|成功處理)'
+)
+HIGHLIGHT_STYLES = {
+    'header': ('', Colors.CYAN),
+    'accuracy': ('  ', Colors.YELLOW),
+    'summary': ('  ', Colors.GREEN),
+}
+
+def classify_test_case(classname: str, test_name: str) -> str:
+    """將單一測試案例歸入對應的測試群組"""
+    if test_name == 'test_recognition_methods_comparison':
+        return '識別方法比較測試'
+    # 逐圖參數化測試的名稱帶 parametrize id（例如 [PXL_xxx.jpg]），用前綴比對
+    if (test_name.startswith('test_single_image_basic_recognition')
+            or test_name == 'test_batch_recognition_summary'):
+        return '批次識別測試'
+    if 'TestImageRecognitionAccuracy' in classname:
+        return '識別一致性測試'
+    return '真實圖片識別測試'
+
 def run_accuracy_tests():
-    """執行準確性測試"""
-    test_commands = [
-        {
-            'name': '真實圖片識別測試',
-            'command': ['python', '-m', 'pytest', 'tests/test_real_image_recognition.py::TestRealImageRecognition', '-v', '-s'],
-            'description': '測試特定圖片的識別準確性'
-        },
-        {
-            'name': '識別方法比較測試',
-            'command': ['python', '-m', 'pytest', 'tests/test_real_image_recognition.py::TestRealImageRecognition::test_recognition_methods_comparison', '-v', '-s'],
-            'description': '比較 Claude AI 和傳統 OCR 效果'
-        },
-        {
-            'name': '批次識別測試',
-            'command': ['python', '-m', 'pytest', 'tests/test_real_image_recognition.py::TestRealImageRecognition::test_all_data_images_basic_recognition', '-v', '-s'],
-            'description': '測試所有圖片的基本識別能力'
-        },
-        {
-            'name': '識別一致性測試',
-            'command': ['python', '-m', 'pytest', 'tests/test_real_image_recognition.py::TestImageRecognitionAccuracy', '-v', '-s'],
-            'description': '測試識別結果的穩定性和一致性'
-        }
+    """
+    執行準確性測試
+    所有測試群組在單一 pytest 行程內執行（省去重複的直譯器啟動與收集成本），
+    再由 junit-xml 報告解析出各群組的結果
+    """
+    junit_file = Path('accuracy_test_results.xml')
+    command = [
+        'python', '-m', 'pytest', 'tests/test_real_image_recognition.py',
+        '-v', '-s', f'--junitxml={junit_file}', '-p', 'no:cacheprovider',
+        # 測試模組的重點輸出走 logging（延遲格式化），要開 live log 才會
+        # 印到 stdout，重點標示的樣式比對才有內容可掃
+        '-o', 'log_cli=true', '--log-cli-level=INFO',
     ]
-    
+
+    # pytest-xdist 可用時以 loadscope 把各測試類別分散到多個 worker 平行執行
+    # 牆鐘時間從各群組耗時總和降為最長群組的耗時
+    try:
+        distribution('pytest-xdist')
+        command += ['-n', 'auto', '--dist', 'loadscope']
+    except PackageNotFoundError:
+        pass
+
+    print_colored(f"\n{'='*60}", Colors.BLUE)
+    print_colored("執行所有準確性測試（單一 pytest 行程）", Colors.BLUE + Colors.BOLD)
+    print_colored(f"命令: {' '.join(command)}", Colors.BLUE)
+    print_colored(f"{'='*60}", Colors.BLUE)
+
+    # 以管線逐行讀取輸出：重點標示即時顯示，也不用把整份 log 緩衝在記憶體
+    output_lines = []
+    try:
+        process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            cwd=Path.cwd()
+        )
+        for line in process.stdout:
+            line = line.rstrip('\n')
+            output_lines.append(line)
+
+            match = HIGHLIGHT_PATTERN.search(line)
+            if match:
+                indent, color = HIGHLIGHT_STYLES[match.lastgroup]
+                print_colored(indent + line, color)
+
+        process.wait(timeout=600)  # 10分鐘超時
+    except subprocess.TimeoutExpired:
+        process.kill()
+        print_colored("⏰ 測試超時", Colors.RED)
+        return {
+            name: {'status': 'TIMEOUT', 'output': '', 'error': 'Test timed out after 10 minutes'}
+            for name, _ in TEST_GROUPS
+        }
+    except Exception as e:
+        print_colored(f"💥 測試執行錯誤: {str(e)}", Colors.RED)
+        return {
+            name: {'status': 'ERROR', 'output': '', 'error': str(e)}
+            for name, _ in TEST_GROUPS
+        }
+
+    stdout_text = '\n'.join(output_lines)
+
+    # 以 junit-xml 取得各測試案例狀態，取代 stdout 字串比對
+    group_failures = {name: [] for name, _ in TEST_GROUPS}
+    try:
+        root = ET.parse(junit_file).getroot()
+        for testcase in root.iter('testcase'):
+            group = classify_test_case(testcase.get('classname', ''), testcase.get('name', ''))
+            failure = testcase.find('failure')
+            if failure is None:
+                failure = testcase.find('error')
+            if failure is not None:
+                group_failures[group].append(f"{testcase.get('name')}: {failure.get('message', '')}")
+    except (ET.ParseError, OSError) as e:
+        print_colored(f"⚠️  無法解析 junit-xml 報告: {str(e)}", Colors.YELLOW)
+        return {
+            name: {'status': 'ERROR', 'output': stdout_text, 'error': str(e)}
+            for name, _ in TEST_GROUPS
+        }
+
     results = {}
-    total_tests = len(test_commands)
-    
-    for i, test_info in enumerate(test_commands, 1):
-        print_colored(f"\n{'='*60}", Colors.BLUE)
-        print_colored(f"執行測試 {i}/{total_tests}: {test_info['name']}", Colors.BLUE + Colors.BOLD)
-        print_colored(f"說明: {test_info['description']}", Colors.BLUE)
-        print_colored(f"命令: {' '.join(test_info['command'])}", Colors.BLUE)
-        print_colored(f"{'='*60}", Colors.BLUE)
-        
-        try:
-            result = subprocess.run(
-                test_info['command'],
-                capture_output=True,
-                text=True,
-                cwd=Path.cwd(),
-                timeout=300  # 5分鐘超時
-            )
-            
-            if result.returncode == 0:
-                print_colored("✅ 測試通過!", Colors.GREEN)
-                results[test_info['name']] = {
-                    'status': 'PASSED',
-                    'output': result.stdout,
-                    'error': result.stderr
-                }
-            else:
-                print_colored("❌ 測試失敗!", Colors.RED)
-                results[test_info['name']] = {
-                    'status': 'FAILED',
-                    'output': result.stdout,
-                    'error': result.stderr
-                }
-                print_colored("錯誤輸出:", Colors.RED)
-                if result.stderr:
-                    print(result.stderr)
-                if result.stdout:
-                    print(result.stdout)
-            
-            # 顯示測試輸出的重要部分
-            if result.stdout:
-                # 尋找測試結果摘要
-                lines = result.stdout.split('\n')
-                for line in lines:
-                    if '===' in line and ('識別結果' in line or '測試' in line):
-                        print_colored(line, Colors.CYAN)
-                    elif '完美匹配' in line or '良好匹配' in line or '準確率' in line:
-                        print_colored(f"  {line}", Colors.YELLOW)
-                    elif '總結:' in line or '成功處理' in line:
-                        print_colored(f"  {line}", Colors.GREEN)
-        
-        except subprocess.TimeoutExpired:
-            print_colored("⏰ 測試超時", Colors.RED)
-            results[test_info['name']] = {
-                'status': 'TIMEOUT',
-                'output': '',
-                'error': 'Test timed out after 5 minutes'
-            }
-        except Exception as e:
-            print_colored(f"💥 測試執行錯誤: {str(e)}", Colors.RED)
-            results[test_info['name']] = {
-                'status': 'ERROR',
-                'output': '',
-                'error': str(e)
-            }
-    
+    for name, description in TEST_GROUPS:
+        failures = group_failures[name]
+        if failures:
+            print_colored(f"❌ {name} 失敗!", Colors.RED)
+            for failure in failures:
+                print_colored(f"  {failure}", Colors.RED)
+        else:
+            print_colored(f"✅ {name} 通過!", Colors.GREEN)
+
+        results[name] = {
+            'status': 'FAILED' if failures else 'PASSED',
+            'output': stdout_text if failures else '',
+            'error': '\n'.join(failures)
+        }
+
     return results
 
 def generate_test_report(results: dict):
@@ -213,8 +272,12 @@ def generate_test_report(results: dict):
     
     report_file = f"accuracy_test_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
     try:
-        with open(report_file, 'w', encoding='utf-8') as f:
-            json.dump(report_data, f, indent=2, ensure_ascii=False)
+        if ORJSON_AVAILABLE:
+            with open(report_file, 'wb') as f:
+                f.write(orjson.dumps(report_data, option=orjson.OPT_INDENT_2))
+        else:
+            with open(report_file, 'w', encoding='utf-8') as f:
+                json.dump(report_data, f, indent=2, ensure_ascii=False)
         print_colored(f"\n📋 詳細報告已儲存: {report_file}", Colors.CYAN)
     except Exception as e:
         print_colored(f"⚠️  無法儲存報告: {str(e)}", Colors.YELLOW)
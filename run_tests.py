@@ -7,6 +7,7 @@
 import subprocess
 import sys
 import os
+from importlib.metadata import distribution, PackageNotFoundError
 from pathlib import Path
 
 def run_command(command, description):
@@ -52,11 +53,12 @@ def check_dependencies():
     ]
     
     missing_packages = []
-    
+
+    # 只讀取套件 metadata 判斷是否安裝，不實際匯入（省去 pandas/cv2 等冷啟動成本）
     for package in required_packages:
         try:
-            __import__(package.replace('-', '_'))
-        except ImportError:
+            distribution(package)
+        except PackageNotFoundError:
             missing_packages.append(package)
     
     if missing_packages:
@@ -87,26 +89,9 @@ def run_linting():
 
 def run_unit_tests():
     """執行單元測試"""
-    test_commands = [
-        # 執行所有測試
-        (['python', '-m', 'pytest', 'tests/', '-v'], "執行所有單元測試"),
-        
-        # 執行特定模組測試
-        (['python', '-m', 'pytest', 'tests/test_image_processor.py', '-v'], "圖片處理器測試"),
-        (['python', '-m', 'pytest', 'tests/test_database_service.py', '-v'], "資料庫服務測試"),
-        (['python', '-m', 'pytest', 'tests/test_csv_exporter.py', '-v'], "CSV匯出器測試"),
-        (['python', '-m', 'pytest', 'tests/test_main_api.py', '-v'], "API端點測試"),
-        (['python', '-m', 'pytest', 'tests/test_claude_vision_service.py', '-v'], "Claude AI服務測試"),
-    ]
-    
-    all_success = True
-    
-    for command, description in test_commands:
-        success = run_command(command, description)
-        if not success:
-            all_success = False
-    
-    return all_success
+    # 單一 pytest 行程就會收集並執行 tests/ 下所有模組
+    # 逐模組再各跑一次只是重複付出直譯器啟動與套件匯入成本
+    return run_command(['python', '-m', 'pytest', 'tests/', '-v'], "執行所有單元測試")
 
 def run_coverage_report():
     """執行測試覆蓋率報告"""
@@ -152,7 +137,12 @@ def run_accuracy_tests():
         print("⚠️  data 資料夾不存在，跳過準確性測試")
         return True
     
-    image_files = list(data_path.glob("*.jpg")) + list(data_path.glob("*.jpeg")) + list(data_path.glob("*.png"))
+    # 單次 scandir 掃描即可過濾三種副檔名
+    with os.scandir(data_path) as entries:
+        image_files = [
+            entry.name for entry in entries
+            if entry.is_file() and entry.name.lower().endswith(('.jpg', '.jpeg', '.png'))
+        ]
     if not image_files:
         print("⚠️  data 資料夾中沒有圖片檔案，跳過準確性測試")
         return True
@@ -4,6 +4,8 @@
 一鍵啟動整個電池 OQC 系統
 """
 
+import re
+import shutil
 import subprocess
 import sys
 import os
@@ -12,6 +14,23 @@ import signal
 from pathlib import Path
 import threading
 import webbrowser
+from concurrent.futures import ThreadPoolExecutor
+
+# requests 可能要等 setup_backend 安裝完才存在，缺少時延後到使用時再報錯
+try:
+    import requests
+    # 健康檢查共用連線（keep-alive 重用同一條 TCP 連線，避免每次輪詢都重新握手）
+    _SESSION = requests.Session()
+except ImportError:
+    requests = None
+    _SESSION = None
+
+# 服務輸出過濾關鍵字（bytes pattern，解碼前即可比對，一行各掃描一次）
+_ERR_RE = re.compile(rb'error|failed|exception', re.I)
+_OK_RE = re.compile(rb'running|started|listening', re.I)
+
+# 服務輸出讀取區塊大小
+_OUTPUT_CHUNK_SIZE = 65536
 
 class Colors:
     """終端顏色"""
@@ -22,9 +41,13 @@ class Colors:
     ENDC = '\033[0m'
     BOLD = '\033[1m'
 
+# 多執行緒設置階段共用的輸出鎖，避免訊息交錯
+_PRINT_LOCK = threading.Lock()
+
 def print_colored(message, color=Colors.ENDC):
     """印出彩色訊息"""
-    print(f"{color}{message}{Colors.ENDC}")
+    with _PRINT_LOCK:
+        print(f"{color}{message}{Colors.ENDC}")
 
 def print_banner():
     """印出系統橫幅"""
@@ -36,30 +59,58 @@ def print_banner():
     """
     print_colored(banner, Colors.BLUE + Colors.BOLD)
 
-def check_dependencies():
-    """檢查系統依賴"""
+def check_dependencies(quick=None):
+    """檢查系統依賴（quick 模式只查 PATH，不執行版本查詢）"""
     print_colored("🔍 檢查系統依賴...", Colors.YELLOW)
-    
+
     dependencies = {
         'python': ['python', '--version'],
         'node': ['node', '--version'],
         'npm': ['npm', '--version'],
         'tesseract': ['tesseract', '--version'],
     }
-    
-    missing = []
-    
-    for name, command in dependencies.items():
+
+    if quick is None:
+        quick = '--quick' in sys.argv or os.environ.get('OQC_QUICK_CHECK') == '1'
+
+    # 快速模式：shutil.which 只查 PATH，不 fork+exec 外部程式
+    if quick:
+        missing = [name for name in dependencies if shutil.which(name) is None]
+
+        for name in dependencies:
+            if name in missing:
+                print_colored(f"  ❌ {name}: 未安裝", Colors.RED)
+            else:
+                print_colored(f"  ✅ {name}", Colors.GREEN)
+
+        if missing:
+            print_colored(f"\n❌ 缺少依賴: {', '.join(missing)}", Colors.RED)
+            print_colored("請參考 SETUP.md 安裝必要的依賴", Colors.YELLOW)
+            return False
+
+        print_colored("✅ 所有依賴都已安裝", Colors.GREEN)
+        return True
+
+    def probe(command):
+        """執行版本查詢（找不到命令時回傳 None）"""
         try:
-            result = subprocess.run(command, capture_output=True, text=True)
-            if result.returncode == 0:
+            return subprocess.run(command, capture_output=True, text=True)
+        except FileNotFoundError:
+            return None
+
+    missing = []
+
+    # 四個版本查詢各自 fork+exec、彼此獨立，併發執行讓總耗時縮到最慢的一個
+    with ThreadPoolExecutor(max_workers=len(dependencies)) as executor:
+        results = executor.map(probe, dependencies.values())
+
+        for name, result in zip(dependencies, results):
+            if result is not None and result.returncode == 0:
                 version = result.stdout.strip().split('\n')[0]
                 print_colored(f"  ✅ {name}: {version}", Colors.GREEN)
             else:
                 missing.append(name)
-        except FileNotFoundError:
-            missing.append(name)
-            print_colored(f"  ❌ {name}: 未安裝", Colors.RED)
+                print_colored(f"  ❌ {name}: 未安裝", Colors.RED)
     
     if missing:
         print_colored(f"\n❌ 缺少依賴: {', '.join(missing)}", Colors.RED)
@@ -71,18 +122,22 @@ def check_dependencies():
 
 def check_data_folder():
     """檢查資料夾"""
-    data_folder = Path("data")
-    if not data_folder.exists():
+    if not os.path.isdir("data"):
         print_colored("❌ data 資料夾不存在", Colors.RED)
         return False
-    
-    image_files = list(data_folder.glob("*.jpg")) + list(data_folder.glob("*.png"))
-    
-    if not image_files:
+
+    # 單次 scandir 掃描即可計數所有支援的副檔名
+    with os.scandir("data") as entries:
+        image_count = sum(
+            1 for entry in entries
+            if entry.is_file() and entry.name.lower().endswith(('.jpg', '.jpeg', '.png'))
+        )
+
+    if not image_count:
         print_colored("⚠️  data 資料夾中沒有圖片檔案", Colors.YELLOW)
     else:
-        print_colored(f"✅ 找到 {len(image_files)} 個圖片檔案", Colors.GREEN)
-    
+        print_colored(f"✅ 找到 {image_count} 個圖片檔案", Colors.GREEN)
+
     return True
 
 def setup_backend():
@@ -108,7 +163,7 @@ def setup_backend():
     
     if not env_file.exists() and env_example.exists():
         print_colored("  ⚙️  建立環境變數檔案...", Colors.BLUE)
-        subprocess.run(["cp", str(env_example), str(env_file)])
+        shutil.copyfile(env_example, env_file)
         print_colored("  ⚠️  請編輯 backend/.env 檔案設置正確的資料庫連線", Colors.YELLOW)
     
     print_colored("✅ Backend 環境設置完成", Colors.GREEN)
@@ -138,14 +193,14 @@ class ServiceRunner:
         print_colored(f"🚀 啟動 {name}...", Colors.BLUE)
         
         try:
+            # 二進位無緩衝管線：監控執行緒以大區塊讀取，不必每行喚醒一次
             process = subprocess.Popen(
                 command,
                 cwd=cwd,
                 env=env,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                bufsize=1
+                bufsize=0
             )
             
             self.processes[name] = process
@@ -164,14 +219,31 @@ class ServiceRunner:
             return False
     
     def _monitor_output(self, name, process):
-        """監控服務輸出"""
-        for line in iter(process.stdout.readline, ''):
-            if self.running:
-                # 過濾重要訊息
-                if any(keyword in line.lower() for keyword in ['error', 'failed', 'exception']):
-                    print_colored(f"[{name}] {line.strip()}", Colors.RED)
-                elif any(keyword in line.lower() for keyword in ['running', 'started', 'listening']):
-                    print_colored(f"[{name}] {line.strip()}", Colors.GREEN)
+        """監控服務輸出（64 KiB 區塊讀取，只解碼需要顯示的行）"""
+        fd = process.stdout.fileno()
+        buffer = bytearray()
+
+        while True:
+            try:
+                chunk = os.read(fd, _OUTPUT_CHUNK_SIZE)
+            except OSError:
+                break
+            if not chunk:
+                break
+
+            buffer.extend(chunk)
+            *lines, remainder = buffer.split(b'\n')
+            buffer = bytearray(remainder)
+
+            if not self.running:
+                continue
+
+            # 過濾重要訊息
+            for line in lines:
+                if _ERR_RE.search(line):
+                    print_colored(f"[{name}] {line.decode('utf-8', 'replace').strip()}", Colors.RED)
+                elif _OK_RE.search(line):
+                    print_colored(f"[{name}] {line.decode('utf-8', 'replace').strip()}", Colors.GREEN)
     
     def stop_all(self):
         """停止所有服務"""
@@ -190,22 +262,29 @@ class ServiceRunner:
         print_colored("✅ 所有服務已停止", Colors.GREEN)
 
 def wait_for_service(url, service_name, timeout=60):
-    """等待服務啟動"""
-    import requests
-    
+    """等待服務啟動（指數退避輪詢：50ms 起跳、上限 1 秒）"""
+    global _SESSION
+    if _SESSION is None:
+        # 啟動時未安裝 requests，setup_backend 後重試匯入
+        import requests
+        _SESSION = requests.Session()
+
     print_colored(f"⏳ 等待 {service_name} 啟動...", Colors.YELLOW)
-    
-    for i in range(timeout):
+
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    while time.monotonic() < deadline:
         try:
-            response = requests.get(url, timeout=1)
+            response = _SESSION.get(url, timeout=0.5)
             if response.status_code == 200:
                 print_colored(f"✅ {service_name} 已啟動", Colors.GREEN)
                 return True
         except:
             pass
-        
-        time.sleep(1)
-    
+
+        time.sleep(delay)
+        delay = min(delay * 2, 1.0)
+
     print_colored(f"❌ {service_name} 啟動超時", Colors.RED)
     return False
 
@@ -221,9 +300,12 @@ def main():
     if not check_data_folder():
         sys.exit(1)
     
-    # 設置環境
-    setup_backend()
-    setup_frontend()
+    # 設置環境（backend/frontend 目錄互不相干，pip 與 npm 安裝併發執行）
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        backend_future = executor.submit(setup_backend)
+        frontend_future = executor.submit(setup_frontend)
+        backend_future.result()
+        frontend_future.result()
     
     # 建立服務執行器
     runner = ServiceRunner()
@@ -269,13 +351,14 @@ def main():
                         webbrowser.open("http://localhost:3000")
                         
                         print_colored("\n按 Ctrl+C 停止系統", Colors.YELLOW)
-                        
-                        # 等待中斷信號
-                        signal.signal(signal.SIGINT, lambda sig, frame: runner.stop_all())
-                        
-                        # 保持主線程運行
-                        while runner.running:
-                            time.sleep(1)
+
+                        # 等待中斷信號（Event 等待不需逐秒喚醒主執行緒）
+                        stop_event = threading.Event()
+                        signal.signal(
+                            signal.SIGINT,
+                            lambda sig, frame: (runner.stop_all(), stop_event.set())
+                        )
+                        stop_event.wait()
     
     except KeyboardInterrupt:
         runner.stop_all()
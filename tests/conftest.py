@@ -1,11 +1,15 @@
 import pytest
 import asyncio
 import os
-import sys
 from unittest.mock import Mock, AsyncMock
 
-# Add backend directory to Python path for testing
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../backend'))
+import numpy as np
+
+# mock_cv2 共用的空白影像：一次配置、設為唯讀，每個測試重用同一份
+_BLANK_BGR = np.zeros((480, 640, 3), dtype=np.uint8)
+_BLANK_BGR.setflags(write=False)
+_BLANK_GRAY = np.zeros((480, 640), dtype=np.uint8)
+_BLANK_GRAY.setflags(write=False)
 
 # Configure pytest-asyncio
 pytest_plugins = ('pytest_asyncio',)
@@ -17,30 +21,44 @@ def event_loop():
     yield loop
     loop.close()
 
-@pytest.fixture
+def _configure_prisma_defaults(mock_client):
+    """設定 Prisma mock 的預設回傳值（建立與重置共用）"""
+    mock_client.batterycell.find_many.return_value = []
+    mock_client.batterycell.find_unique.return_value = None
+    mock_client.batchprocess.find_many.return_value = []
+
+@pytest.fixture(scope="session")
 def mock_prisma_client():
-    """Mock Prisma database client for testing"""
+    """Mock Prisma database client for testing（session 層級共用，逐測試重置）"""
     mock_client = Mock()
-    
+
     # Mock batterycell operations
     mock_client.batterycell = Mock()
     mock_client.batterycell.create = AsyncMock()
-    mock_client.batterycell.find_many = AsyncMock(return_value=[])
-    mock_client.batterycell.find_unique = AsyncMock(return_value=None)
+    mock_client.batterycell.find_many = AsyncMock()
+    mock_client.batterycell.find_unique = AsyncMock()
     mock_client.batterycell.update = AsyncMock()
     mock_client.batterycell.delete = AsyncMock()
-    
+
     # Mock batchprocess operations
     mock_client.batchprocess = Mock()
     mock_client.batchprocess.create = AsyncMock()
-    mock_client.batchprocess.find_many = AsyncMock(return_value=[])
-    
+    mock_client.batchprocess.find_many = AsyncMock()
+
     # Mock connection methods
     mock_client.connect = AsyncMock()
     mock_client.disconnect = AsyncMock()
-    
+
+    _configure_prisma_defaults(mock_client)
     return mock_client
 
+@pytest.fixture(autouse=True)
+def _reset_prisma_client(mock_prisma_client):
+    """測試結束後清除呼叫記錄與測試內覆寫的回傳值"""
+    yield
+    mock_prisma_client.reset_mock(return_value=True, side_effect=True)
+    _configure_prisma_defaults(mock_prisma_client)
+
 @pytest.fixture
 def mock_tesseract():
     """Mock Tesseract OCR for testing"""
@@ -72,22 +90,19 @@ def sample_ocr_text():
 @pytest.fixture
 def mock_cv2():
     """Mock OpenCV functions for testing"""
-    import numpy as np
-    
     with pytest.MonkeyPatch.context() as m:
-        # Mock imread
-        mock_imread = Mock()
-        test_image = np.zeros((480, 640, 3), dtype=np.uint8)
-        mock_imread.return_value = test_image
-        m.setattr("cv2.imread", mock_imread)
-        
+        # Mock imdecode（共用模組層級的唯讀空白影像，不逐測試重新配置）
+        mock_imdecode = Mock()
+        mock_imdecode.return_value = _BLANK_BGR
+        m.setattr("cv2.imdecode", mock_imdecode)
+
         # Mock other CV2 functions
-        m.setattr("cv2.cvtColor", Mock(return_value=np.zeros((480, 640), dtype=np.uint8)))
-        m.setattr("cv2.createCLAHE", Mock(return_value=Mock(apply=Mock(return_value=np.zeros((480, 640), dtype=np.uint8)))))
-        m.setattr("cv2.GaussianBlur", Mock(return_value=np.zeros((480, 640), dtype=np.uint8)))
-        m.setattr("cv2.threshold", Mock(return_value=(0, np.zeros((480, 640), dtype=np.uint8))))
-        
-        yield mock_imread
+        m.setattr("cv2.cvtColor", Mock(return_value=_BLANK_GRAY))
+        m.setattr("cv2.createCLAHE", Mock(return_value=Mock(apply=Mock(return_value=_BLANK_GRAY))))
+        m.setattr("cv2.GaussianBlur", Mock(return_value=_BLANK_GRAY))
+        m.setattr("cv2.threshold", Mock(return_value=(0, _BLANK_GRAY)))
+
+        yield mock_imdecode
 
 # Test data fixtures
 @pytest.fixture
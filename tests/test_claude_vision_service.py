@@ -6,9 +6,6 @@ import os
 from unittest.mock import Mock, AsyncMock, patch, MagicMock
 from datetime import datetime
 
-import sys
-sys.path.append('../backend')
-
 from backend.services.claude_vision_service import ClaudeVisionService
 from backend.models.battery import BatteryCellResponse
 
@@ -124,6 +121,7 @@ class TestClaudeVisionService:
         assert 'Voltage' in prompt
         assert 'JSON' in prompt
     
+    @pytest.mark.asyncio
     @patch('backend.services.claude_vision_service.config')
     async def test_analyze_battery_image_success(self, mock_config, mock_anthropic_client, temp_image_file):
         """測試成功分析電池圖片"""
@@ -147,6 +145,7 @@ class TestClaudeVisionService:
             assert battery.voltage == 3.40
             assert battery.image_file == 'test.jpg'
     
+    @pytest.mark.asyncio
     @patch('backend.services.claude_vision_service.config')
     async def test_analyze_battery_image_service_not_available(self, mock_config, temp_image_file):
         """測試服務不可用時的情況"""
@@ -157,6 +156,7 @@ class TestClaudeVisionService:
         
         assert result == []
     
+    @pytest.mark.asyncio
     @patch('backend.services.claude_vision_service.config')
     async def test_analyze_battery_image_anthropic_error(self, mock_config, temp_image_file):
         """測試 Anthropic API 錯誤"""
@@ -175,6 +175,74 @@ class TestClaudeVisionService:
             
             assert result == []
     
+    @pytest.mark.asyncio
+    @patch('backend.services.claude_vision_service.config')
+    async def test_analyze_battery_image_cached_result(self, mock_config, mock_anthropic_client, temp_image_file):
+        """測試相同圖片內容重用快取結果"""
+        mock_config.side_effect = lambda key, default='': {
+            'ANTHROPIC_API_KEY': 'test-api-key',
+            'CLAUDE_MODEL': 'claude-3-5-sonnet-20241022'
+        }.get(key, default)
+
+        with patch('backend.services.claude_vision_service.Anthropic', return_value=mock_anthropic_client):
+            service = ClaudeVisionService()
+
+            first_result = await service.analyze_battery_image(temp_image_file, 'test.jpg')
+            second_result = await service.analyze_battery_image(temp_image_file, 'test.jpg')
+
+            # Second call should hit the cache instead of the API
+            assert mock_anthropic_client.messages.create.call_count == 1
+            assert len(second_result) == len(first_result) == 1
+            assert second_result[0].serial_number == first_result[0].serial_number
+
+            # Cached copies must not share state with earlier results
+            first_result[0].recognition_method = "Claude AI"
+            assert second_result[0].recognition_method is None
+
+    @pytest.mark.asyncio
+    @patch('backend.services.claude_vision_service.config')
+    async def test_analyze_batch_success(self, mock_config, mock_anthropic_client, temp_image_file):
+        """測試 Message Batches API 批次分析"""
+        mock_config.side_effect = lambda key, default='': {
+            'ANTHROPIC_API_KEY': 'test-api-key',
+            'CLAUDE_MODEL': 'claude-3-5-sonnet-20241022'
+        }.get(key, default)
+
+        # Mock batch lifecycle: create -> ended -> results
+        mock_batch = Mock()
+        mock_batch.id = 'batch_123'
+        mock_batch.processing_status = 'ended'
+        mock_anthropic_client.messages.batches.create.return_value = mock_batch
+
+        mock_entry = Mock()
+        mock_entry.custom_id = 'image_0'
+        mock_entry.result.type = 'succeeded'
+        mock_content = Mock()
+        mock_content.text = '{"batteries": [{"serial_number": "C044160", "model": "6754E4", "energy": 36.74, "capacity": 10.8, "voltage": 3.40}], "total_batteries_found": 1}'
+        mock_entry.result.message.content = [mock_content]
+        mock_anthropic_client.messages.batches.results.return_value = [mock_entry]
+
+        with patch('backend.services.claude_vision_service.Anthropic', return_value=mock_anthropic_client):
+            service = ClaudeVisionService()
+
+            result = await service.analyze_batch([(temp_image_file, 'test.jpg')])
+
+            assert 'test.jpg' in result
+            assert len(result['test.jpg']) == 1
+            assert result['test.jpg'][0].serial_number == "C044160"
+            mock_anthropic_client.messages.batches.create.assert_called_once()
+
+    @pytest.mark.asyncio
+    @patch('backend.services.claude_vision_service.config')
+    async def test_analyze_batch_service_not_available(self, mock_config, temp_image_file):
+        """測試服務不可用時批次分析返回空字典"""
+        mock_config.return_value = ''
+        service = ClaudeVisionService()
+
+        result = await service.analyze_batch([(temp_image_file, 'test.jpg')])
+
+        assert result == {}
+
     @patch('backend.services.claude_vision_service.config')
     def test_parse_claude_response_success(self, mock_config):
         """測試成功解析 Claude 回應"""
@@ -340,6 +408,7 @@ class TestClaudeVisionService:
         assert info['model'] == None
         assert info['api_key_configured'] == False
     
+    @pytest.mark.asyncio
     @patch('backend.services.claude_vision_service.config')
     async def test_analyze_image_with_confidence_scores(self, mock_config, temp_image_file):
         """測試包含信心度分數的分析"""
@@ -5,9 +5,6 @@ import os
 from datetime import datetime
 from unittest.mock import Mock, patch
 
-import sys
-sys.path.append('../backend')
-
 from backend.utils.csv_exporter import CSVExporter
 from backend.models.battery import BatteryCellResponse
 
@@ -157,6 +154,24 @@ class TestCSVExporter:
         assert df.iloc[0]['Created At'] == ''
         assert df.iloc[0]['Updated At'] == ''
     
+    def test_export_batteries_parquet(self, csv_exporter, sample_batteries, temp_output_dir):
+        """測試匯出 parquet 格式"""
+        pytest.importorskip('pyarrow')
+
+        filepath = csv_exporter.export_batteries(sample_batteries, output_format='parquet')
+
+        assert os.path.exists(filepath)
+        assert filepath.endswith('.parquet')
+
+        df = pd.read_parquet(filepath)
+        assert len(df) == 3
+        assert df.iloc[0]['Serial Number'] == 'C044160'
+
+    def test_export_batteries_unsupported_format(self, csv_exporter, sample_batteries):
+        """測試不支援的匯出格式"""
+        with pytest.raises(ValueError):
+            csv_exporter.export_batteries(sample_batteries, output_format='xlsx')
+
     def test_export_summary_report_success(self, csv_exporter, sample_batteries, temp_output_dir):
         """測試成功匯出摘要報告"""
         filepath = csv_exporter.export_summary_report(sample_batteries)
@@ -233,11 +248,12 @@ class TestCSVExporter:
         with pytest.raises(Exception):
             csv_exporter.export_batteries([invalid_battery])
     
-    @patch('pandas.DataFrame.to_csv')
-    def test_export_batteries_pandas_error(self, mock_to_csv, csv_exporter, sample_batteries):
-        """測試 pandas 匯出錯誤"""
-        mock_to_csv.side_effect = Exception("Pandas error")
-        
+    @patch('backend.utils.csv_exporter.POLARS_AVAILABLE', False)
+    @patch('csv.writer')
+    def test_export_batteries_writer_error(self, mock_writer, csv_exporter, sample_batteries):
+        """測試 CSV 寫出錯誤（強制走 csv.writer 路徑，不依賴 polars 是否安裝）"""
+        mock_writer.side_effect = Exception("Writer error")
+
         with pytest.raises(Exception):
             csv_exporter.export_batteries(sample_batteries)
     
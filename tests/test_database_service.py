@@ -3,14 +3,13 @@ import asyncio
 from datetime import datetime
 from unittest.mock import Mock, AsyncMock, patch, MagicMock
 
-import sys
-sys.path.append('../backend')
-
 from backend.services.database_service import DatabaseService
 from backend.models.battery import BatteryCellResponse, BatchProcessResponse
 
 class TestDatabaseService:
-    
+
+    pytestmark = pytest.mark.asyncio
+
     @pytest.fixture
     def database_service(self):
         """測試用的 DatabaseService 實例"""
@@ -95,6 +94,52 @@ class TestDatabaseService:
         with pytest.raises(Exception):
             await database_service.save_battery(sample_battery_data)
     
+    async def test_save_batteries_bulk_success(self, database_service, sample_battery_data):
+        """測試批次儲存電池資料"""
+        mock_tx = Mock()
+        mock_tx.batterycell.create_many = AsyncMock(return_value=1)
+        mock_tx.batchprocess.create = AsyncMock()
+
+        mock_tx_context = MagicMock()
+        mock_tx_context.__aenter__ = AsyncMock(return_value=mock_tx)
+        mock_tx_context.__aexit__ = AsyncMock(return_value=False)
+        database_service.db.tx = Mock(return_value=mock_tx_context)
+
+        result = await database_service.save_batteries_bulk([sample_battery_data], "Test_Batch")
+
+        # Verify the create_many call
+        mock_tx.batterycell.create_many.assert_called_once_with(
+            data=[{
+                'serialNumber': 'C044160',
+                'model': '6754E4',
+                'energy': 36.74,
+                'capacity': 10.8,
+                'voltage': 3.40,
+                'imageFile': 'test.jpg',
+            }],
+            skip_duplicates=False
+        )
+
+        # Verify the batch process record in the same transaction
+        mock_tx.batchprocess.create.assert_called_once_with(
+            data={
+                'batchName': "Test_Batch",
+                'totalCells': 1,
+            }
+        )
+
+        assert result == 1
+
+    async def test_save_batteries_bulk_error(self, database_service, sample_battery_data):
+        """測試批次儲存電池資料時發生錯誤"""
+        mock_tx_context = MagicMock()
+        mock_tx_context.__aenter__ = AsyncMock(side_effect=Exception("Transaction error"))
+        mock_tx_context.__aexit__ = AsyncMock(return_value=False)
+        database_service.db.tx = Mock(return_value=mock_tx_context)
+
+        with pytest.raises(Exception):
+            await database_service.save_batteries_bulk([sample_battery_data], "Test_Batch")
+
     async def test_save_batch_process_success(self, database_service):
         """測試成功儲存批次處理記錄"""
         mock_batch_record = Mock()
@@ -248,7 +293,6 @@ class TestDatabaseService:
         with pytest.raises(Exception):
             await database_service.update_battery(1, sample_battery_data)
     
-    @pytest.mark.asyncio
     async def test_database_service_full_workflow(self, database_service, sample_battery_data):
         """測試完整的資料庫操作流程"""
         # Mock all the database operations
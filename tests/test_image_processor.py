@@ -5,22 +5,21 @@ import tempfile
 import os
 from unittest.mock import Mock, patch, MagicMock
 
-import sys
-sys.path.append('../backend')
-
 from backend.services.image_processor import ImageProcessor
 from backend.models.battery import BatteryCellResponse
 
 class TestImageProcessor:
-    
+
+    pytestmark = pytest.mark.asyncio
+
     @pytest.fixture
     def image_processor(self):
         """測試用的 ImageProcessor 實例"""
         return ImageProcessor()
     
-    @pytest.fixture
+    @pytest.fixture(scope="session")
     def sample_image(self):
-        """建立測試用的圖片"""
+        """建立測試用的圖片（session 層級共用，各測試不重新合成）"""
         # Create a simple test image
         image = np.zeros((480, 640, 3), dtype=np.uint8)
         # Add some text-like patterns
@@ -29,9 +28,9 @@ class TestImageProcessor:
         
         return image
     
-    @pytest.fixture
+    @pytest.fixture(scope="session")
     def temp_image_file(self, sample_image):
-        """建立暫時的測試圖片檔案"""
+        """建立暫時的測試圖片檔案（session 內只編碼寫檔一次）"""
         with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as tmp:
             cv2.imwrite(tmp.name, sample_image)
             yield tmp.name
@@ -120,37 +119,38 @@ class TestImageProcessor:
         assert battery.voltage == 0.0  # Should have default value
     
     @patch('pytesseract.image_to_string')
-    @patch('cv2.imread')
-    async def test_process_image_success(self, mock_imread, mock_ocr, image_processor, sample_image):
+    @patch('cv2.imdecode')
+    @patch('backend.services.image_processor.ImageProcessor._load_image_bytes')
+    async def test_process_image_success(self, mock_load_bytes, mock_imdecode, mock_ocr, image_processor, sample_image):
         """測試成功處理圖片"""
         # Setup mocks
-        mock_imread.return_value = sample_image
+        mock_load_bytes.return_value = b'fake-image-bytes'
+        mock_imdecode.return_value = sample_image
         mock_ocr.return_value = "Serial: C044160 Model: 6754E4 Energy: 36.74Wh Capacity: 10.8Ah Voltage: 3.40V"
-        
+
         result = await image_processor.process_image("test.jpg")
-        
+
         assert len(result) == 1
         assert isinstance(result[0], BatteryCellResponse)
         assert result[0].serial_number == "C044160"
-    
-    @patch('cv2.imread')
-    async def test_process_image_file_not_found(self, mock_imread, image_processor):
+
+    async def test_process_image_file_not_found(self, image_processor):
         """測試圖片檔案不存在的情況"""
-        mock_imread.return_value = None
-        
         result = await image_processor.process_image("nonexistent.jpg")
-        
+
         assert result == []
-    
+
     @patch('pytesseract.image_to_string')
-    @patch('cv2.imread')
-    async def test_process_image_ocr_error(self, mock_imread, mock_ocr, image_processor, sample_image):
+    @patch('cv2.imdecode')
+    @patch('backend.services.image_processor.ImageProcessor._load_image_bytes')
+    async def test_process_image_ocr_error(self, mock_load_bytes, mock_imdecode, mock_ocr, image_processor, sample_image):
         """測試 OCR 錯誤的情況"""
-        mock_imread.return_value = sample_image
+        mock_load_bytes.return_value = b'fake-image-bytes'
+        mock_imdecode.return_value = sample_image
         mock_ocr.side_effect = Exception("OCR Error")
-        
+
         result = await image_processor.process_image("test.jpg")
-        
+
         assert result == []
     
     def test_detect_battery_regions(self, image_processor, sample_image):
@@ -1,23 +1,52 @@
 import pytest
 import asyncio
 from datetime import datetime
-from unittest.mock import Mock, AsyncMock, patch
-from fastapi.testclient import TestClient
-from httpx import AsyncClient
+from types import SimpleNamespace
+from unittest.mock import Mock, MagicMock, AsyncMock, patch
+from httpx import ASGITransport, AsyncClient
 
-import sys
-sys.path.append('../backend')
+import pytest_asyncio
 
 from backend.main import app
 from backend.models.battery import BatteryCellResponse, BatchProcessResponse
 
 class TestMainAPI:
-    
-    @pytest.fixture
-    def client(self):
-        """測試用的 FastAPI 客戶端"""
-        return TestClient(app)
-    
+
+    pytestmark = pytest.mark.asyncio
+
+    @pytest_asyncio.fixture(scope="class")
+    async def client(self):
+        """測試用的 FastAPI 客戶端（直接跑在事件迴圈上，不經執行緒 portal）
+
+        ASGITransport 不觸發 lifespan 事件，維持跳過 startup 的既有行為
+        （startup 會嘗試連接資料庫）
+        """
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as async_client:
+            yield async_client
+
+    @pytest.fixture(autouse=True)
+    def api_mocks(self, monkeypatch):
+        """共用的 API mock 集合（monkeypatch 一次裝好，取代逐測試堆疊 @patch）
+
+        各測試只改需要的 return_value / side_effect，避免每個測試重複
+        做 patch 的屬性解析與還原
+        """
+        m = SimpleNamespace()
+        m.exists = Mock(return_value=True)
+        m.scandir = Mock(return_value=self._mock_scandir([]))
+        m.process_image = AsyncMock(return_value=[])
+        m.save_batteries_bulk = AsyncMock(return_value=0)
+        m.get_batteries = AsyncMock(return_value=[])
+        m.get_batch_processes = AsyncMock(return_value=[])
+
+        monkeypatch.setattr('os.path.exists', m.exists)
+        monkeypatch.setattr('os.scandir', m.scandir)
+        monkeypatch.setattr('backend.main.image_processor.process_image', m.process_image)
+        monkeypatch.setattr('backend.main.db_service.save_batteries_bulk', m.save_batteries_bulk)
+        monkeypatch.setattr('backend.main.db_service.get_batteries', m.get_batteries)
+        monkeypatch.setattr('backend.main.db_service.get_batch_processes', m.get_batch_processes)
+        return m
+
     @pytest.fixture
     def sample_battery_response(self):
         """測試用的電池回應資料"""
@@ -33,65 +62,78 @@ class TestMainAPI:
             created_at=datetime(2024, 1, 1, 12, 0, 0),
             updated_at=datetime(2024, 1, 1, 12, 0, 0)
         )
-    
-    def test_root_endpoint(self, client):
+
+    @staticmethod
+    def _mock_scandir(filenames):
+        """建立 os.scandir 的 mock context manager（產生假的 DirEntry）"""
+        entries = []
+        for filename in filenames:
+            entry = Mock()
+            entry.name = filename
+            entry.path = f"../data/{filename}"
+            entry.is_file.return_value = True
+            entries.append(entry)
+
+        scandir_cm = MagicMock()
+        scandir_cm.__enter__.return_value = iter(entries)
+        return scandir_cm
+
+    async def test_root_endpoint(self, client):
         """測試根路徑端點"""
-        response = client.get("/")
-        
+        response = await client.get("/")
+
         assert response.status_code == 200
         assert response.json() == {"message": "電池 OQC 系統 API"}
-    
-    @patch('backend.main.image_processor.process_image')
-    @patch('os.path.exists')
-    @patch('os.listdir')
-    def test_process_images_success(self, mock_listdir, mock_exists, mock_process_image, client, sample_battery_response):
-        """測試成功處理圖片"""
-        # Setup mocks
-        mock_exists.return_value = True
-        mock_listdir.return_value = ['test1.jpg', 'test2.jpg', 'other.txt']
-        mock_process_image.return_value = [sample_battery_response]
-        
-        response = client.post("/process-images")
-        
-        assert response.status_code == 200
-        data = response.json()
-        
-        assert len(data) == 2  # Only .jpg files should be processed
-        assert data[0]['serial_number'] == 'C044160'
-        assert data[0]['model'] == '6754E4'
-    
-    @patch('os.path.exists')
-    def test_process_images_data_folder_not_found(self, mock_exists, client):
+
+    @pytest.mark.parametrize("filenames,processing_error,expected_status,expected_count", [
+        pytest.param(['test1.jpg', 'test2.jpg', 'other.txt'], False, 200, 2, id='jpg_only'),
+        pytest.param(['text.txt', 'doc.pdf'], False, 200, 0, id='no_image_files'),
+        pytest.param(['image1.jpg', 'image2.JPG', 'image3.png', 'image4.PNG', 'text.txt', 'doc.pdf'],
+                     False, 200, 4, id='mixed_file_types'),
+        # 大量檔名壓力測試：驗證副檔名過濾對每個檔名都是 O(1) 的集合查找
+        pytest.param([f"img{i}.jpg" for i in range(5000)]
+                     + [f"img{i}.PNG" for i in range(3000)]
+                     + [f"img{i}.jpeg" for i in range(2000)]
+                     + [f"doc{i}.txt" for i in range(100)],
+                     False, 200, 10_000, id='extension_filter_pressure'),
+        pytest.param(['test.jpg'], True, 500, None, id='processing_error'),
+    ])
+    async def test_process_images(self, filenames, processing_error, expected_status,
+                                  expected_count, client, api_mocks, sample_battery_response):
+        """測試處理圖片（成功、無圖片、混合副檔名與處理錯誤共用同一組 mock 設定）"""
+        api_mocks.scandir.return_value = self._mock_scandir(filenames)
+        if processing_error:
+            api_mocks.process_image.side_effect = Exception("Processing error")
+        else:
+            api_mocks.process_image.return_value = [sample_battery_response]
+
+        response = await client.post("/process-images")
+
+        assert response.status_code == expected_status
+
+        if expected_status == 200:
+            data = response.json()
+            assert len(data) == expected_count
+            assert api_mocks.process_image.call_count == expected_count
+            if expected_count:
+                assert data[0]['serial_number'] == 'C044160'
+                assert data[0]['model'] == '6754E4'
+        else:
+            assert "Error processing images" in response.json()['detail']
+
+    async def test_process_images_data_folder_not_found(self, client, api_mocks):
         """測試資料夾不存在時的錯誤"""
-        mock_exists.return_value = False
-        
-        response = client.post("/process-images")
-        
+        api_mocks.exists.return_value = False
+
+        response = await client.post("/process-images")
+
         assert response.status_code == 404
         assert "Data folder not found" in response.json()['detail']
-    
-    @patch('backend.main.image_processor.process_image')
-    @patch('os.path.exists')
-    @patch('os.listdir')
-    def test_process_images_processing_error(self, mock_listdir, mock_exists, mock_process_image, client):
-        """測試圖片處理錯誤"""
-        mock_exists.return_value = True
-        mock_listdir.return_value = ['test.jpg']
-        mock_process_image.side_effect = Exception("Processing error")
-        
-        response = client.post("/process-images")
-        
-        assert response.status_code == 500
-        assert "Error processing images" in response.json()['detail']
-    
-    @patch('backend.main.db_service.save_battery')
-    @patch('backend.main.db_service.save_batch_process')
-    def test_save_batteries_success(self, mock_save_batch, mock_save_battery, client, sample_battery_response):
+
+    async def test_save_batteries_success(self, client, api_mocks, sample_battery_response):
         """測試成功儲存電池資料"""
-        # Setup mocks
-        mock_save_battery.return_value = sample_battery_response
-        mock_save_batch.return_value = Mock()
-        
+        api_mocks.save_batteries_bulk.return_value = 1
+
         battery_data = [{
             "serial_number": "C044160",
             "model": "6754E4",
@@ -100,20 +142,19 @@ class TestMainAPI:
             "voltage": 3.40,
             "image_file": "test.jpg"
         }]
-        
-        response = client.post("/save-batteries", json=battery_data)
-        
+
+        response = await client.post("/save-batteries", json=battery_data)
+
         assert response.status_code == 200
         data = response.json()
-        
+
         assert "Successfully saved 1 batteries" in data['message']
         assert data['count'] == 1
-    
-    @patch('backend.main.db_service.save_battery')
-    def test_save_batteries_error(self, mock_save_battery, client):
+
+    async def test_save_batteries_error(self, client, api_mocks):
         """測試儲存電池資料錯誤"""
-        mock_save_battery.side_effect = Exception("Database error")
-        
+        api_mocks.save_batteries_bulk.side_effect = Exception("Database error")
+
         battery_data = [{
             "serial_number": "C044160",
             "model": "6754E4",
@@ -122,73 +163,64 @@ class TestMainAPI:
             "voltage": 3.40,
             "image_file": "test.jpg"
         }]
-        
-        response = client.post("/save-batteries", json=battery_data)
-        
+
+        response = await client.post("/save-batteries", json=battery_data)
+
         assert response.status_code == 500
         assert "Error saving batteries" in response.json()['detail']
-    
-    @patch('backend.main.db_service.get_batteries')
-    def test_get_batteries_success(self, mock_get_batteries, client, sample_battery_response):
+
+    async def test_get_batteries_success(self, client, api_mocks, sample_battery_response):
         """測試成功取得電池列表"""
-        mock_get_batteries.return_value = [sample_battery_response]
-        
-        response = client.get("/batteries?skip=0&limit=10")
-        
+        api_mocks.get_batteries.return_value = [sample_battery_response]
+
+        response = await client.get("/batteries?skip=0&limit=10")
+
         assert response.status_code == 200
         data = response.json()
-        
+
         assert len(data) == 1
         assert data[0]['serial_number'] == 'C044160'
-    
-    @patch('backend.main.db_service.get_batteries')
-    def test_get_batteries_default_params(self, mock_get_batteries, client):
+
+    async def test_get_batteries_default_params(self, client, api_mocks):
         """測試使用預設參數取得電池列表"""
-        mock_get_batteries.return_value = []
-        
-        response = client.get("/batteries")
-        
-        mock_get_batteries.assert_called_once_with(skip=0, limit=100)
+        response = await client.get("/batteries")
+
+        api_mocks.get_batteries.assert_called_once_with(skip=0, limit=100)
         assert response.status_code == 200
-    
-    @patch('backend.main.db_service.get_batteries')
-    def test_get_batteries_error(self, mock_get_batteries, client):
+
+    async def test_get_batteries_error(self, client, api_mocks):
         """測試取得電池列表錯誤"""
-        mock_get_batteries.side_effect = Exception("Database error")
-        
-        response = client.get("/batteries")
-        
+        api_mocks.get_batteries.side_effect = Exception("Database error")
+
+        response = await client.get("/batteries")
+
         assert response.status_code == 500
         assert "Error retrieving batteries" in response.json()['detail']
-    
-    @patch('backend.main.csv_exporter.export_batteries')
-    @patch('backend.main.db_service.get_batteries')
-    def test_export_csv_success(self, mock_get_batteries, mock_export_csv, client, sample_battery_response, tmp_path):
-        """測試成功匯出 CSV"""
-        # Create a temporary CSV file
-        csv_file = tmp_path / "test_export.csv"
-        csv_file.write_text("test,data\n1,2")
-        
-        mock_get_batteries.return_value = [sample_battery_response]
-        mock_export_csv.return_value = str(csv_file)
-        
-        response = client.get("/export-csv")
-        
+
+    async def test_export_csv_success(self, client, api_mocks, sample_battery_response):
+        """測試成功匯出 CSV（串流輸出）"""
+        api_mocks.get_batteries.return_value = [sample_battery_response]
+
+        response = await client.get("/export-csv")
+
         assert response.status_code == 200
-        assert response.headers['content-type'] == 'application/octet-stream'
-    
-    @patch('backend.main.db_service.get_batteries')
-    def test_export_csv_error(self, mock_get_batteries, client):
+        assert response.headers['content-type'].startswith('text/csv')
+        assert 'attachment' in response.headers['content-disposition']
+
+        content = response.text
+        assert 'Serial Number' in content  # Header row
+        assert 'C044160' in content  # Battery data row
+
+    async def test_export_csv_error(self, client, api_mocks):
         """測試匯出 CSV 錯誤"""
-        mock_get_batteries.side_effect = Exception("Database error")
-        
-        response = client.get("/export-csv")
-        
+        api_mocks.get_batteries.side_effect = Exception("Database error")
+
+        response = await client.get("/export-csv")
+
         assert response.status_code == 500
         assert "Error exporting CSV" in response.json()['detail']
-    
-    @patch('backend.main.db_service.get_batch_processes')
-    def test_get_batches_success(self, mock_get_batches, client):
+
+    async def test_get_batches_success(self, client, api_mocks):
         """測試成功取得批次列表"""
         mock_batch = BatchProcessResponse(
             id=1,
@@ -197,75 +229,40 @@ class TestMainAPI:
             processed_at=datetime(2024, 1, 1, 12, 0, 0),
             created_at=datetime(2024, 1, 1, 12, 0, 0)
         )
-        mock_get_batches.return_value = [mock_batch]
-        
-        response = client.get("/batches")
-        
+        api_mocks.get_batch_processes.return_value = [mock_batch]
+
+        response = await client.get("/batches")
+
         assert response.status_code == 200
         data = response.json()
-        
+
         assert len(data) == 1
         assert data[0]['batch_name'] == "Test_Batch"
         assert data[0]['total_cells'] == 5
-    
-    @patch('backend.main.db_service.get_batch_processes')
-    def test_get_batches_error(self, mock_get_batches, client):
+
+    async def test_get_batches_error(self, client, api_mocks):
         """測試取得批次列表錯誤"""
-        mock_get_batches.side_effect = Exception("Database error")
-        
-        response = client.get("/batches")
-        
+        api_mocks.get_batch_processes.side_effect = Exception("Database error")
+
+        response = await client.get("/batches")
+
         assert response.status_code == 500
         assert "Error retrieving batches" in response.json()['detail']
-    
-    def test_cors_headers(self, client):
+
+    async def test_cors_headers(self, client):
         """測試 CORS 標頭"""
-        response = client.options("/", headers={"Origin": "http://localhost:3000"})
-        
+        response = await client.options("/", headers={"Origin": "http://localhost:3000"})
+
         # FastAPI automatically handles OPTIONS requests for CORS
         assert response.status_code in [200, 405]  # 405 if OPTIONS not explicitly defined
-    
-    @patch('os.path.exists')
-    @patch('os.listdir')
-    def test_process_images_no_image_files(self, mock_listdir, mock_exists, client):
-        """測試資料夾中沒有圖片檔案"""
-        mock_exists.return_value = True
-        mock_listdir.return_value = ['text.txt', 'doc.pdf']  # No image files
-        
-        response = client.post("/process-images")
-        
-        assert response.status_code == 200
-        data = response.json()
-        
-        assert data == []  # Should return empty list
-    
-    @patch('backend.main.image_processor.process_image')
-    @patch('os.path.exists')
-    @patch('os.listdir')
-    def test_process_images_mixed_file_types(self, mock_listdir, mock_exists, mock_process_image, client, sample_battery_response):
-        """測試處理混合檔案類型"""
-        mock_exists.return_value = True
-        mock_listdir.return_value = ['image1.jpg', 'image2.JPG', 'image3.png', 'image4.PNG', 'text.txt', 'doc.pdf']
-        mock_process_image.return_value = [sample_battery_response]
-        
-        response = client.post("/process-images")
-        
-        assert response.status_code == 200
-        data = response.json()
-        
-        # Should process 4 image files (jpg, JPG, png, PNG)
-        assert len(data) == 4
-        
-        # Verify process_image was called for each image file
-        assert mock_process_image.call_count == 4
-    
-    def test_api_response_format(self, client):
+
+    async def test_api_response_format(self, client):
         """測試 API 回應格式"""
-        response = client.get("/")
-        
+        response = await client.get("/")
+
         assert response.status_code == 200
         assert response.headers['content-type'] == 'application/json'
-        
+
         data = response.json()
         assert isinstance(data, dict)
-        assert 'message' in data
\ No newline at end of file
+        assert 'message' in data
@@ -1,104 +1,111 @@
 import pytest
 import asyncio
+import logging
 import os
+import numpy as np
+from collections import namedtuple
+from types import MappingProxyType
 from unittest.mock import Mock, AsyncMock, patch
 from pathlib import Path
 
-import sys
-sys.path.append('../backend')
+from pydantic import BaseModel, Field, ValidationError
+
+try:
+    from scipy.optimize import linear_sum_assignment
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
 
 from backend.services.image_processor import ImageProcessor
 from backend.services.claude_vision_service import ClaudeVisionService
 from backend.models.battery import BatteryCellResponse
 
+# 延遲格式化：log 層級高於 INFO 時（CI 預設）連格式化成本都省下
+log = logging.getLogger(__name__)
+
+class _ExpectedCell(BaseModel):
+    """預期電池資料的結構與數值範圍（驗證迴圈下沉到 pydantic-core）"""
+    serial_number: str
+    model: str
+    energy: float = Field(gt=0, lt=100)
+    capacity: float = Field(gt=0, lt=50)
+    voltage: float = Field(gt=0, lt=10)
+
+class _ExpectedFile(BaseModel):
+    """單一圖片的預期結果結構"""
+    total_cells: int
+    cells: list[_ExpectedCell]
+
+# 預期電池資料記錄（不可變、屬性存取比 dict 查找快）
+Cell = namedtuple('Cell', ('serial_number', 'model', 'energy', 'capacity', 'voltage'))
+
+# 收集階段就探測 data 資料夾：沒有圖片時相關測試在收集時即標記 skip，
+# 不必等到進入測試、建好事件迴圈與 ImageProcessor 後才發現無事可做
+_DATA_DIR = Path(__file__).parent.parent / "data"
+if _DATA_DIR.is_dir():
+    with os.scandir(_DATA_DIR) as _entries:
+        _DATA_IMAGES = [
+            Path(entry.path) for entry in _entries
+            if entry.is_file() and entry.name.lower().endswith(('.jpg', '.jpeg', '.png'))
+        ]
+else:
+    _DATA_IMAGES = []
+
+# 逐圖參數化測試的識別結果，由 summary 測試彙總（單行程執行時填入）
+_BATCH_OUTCOMES = {}
+
+@pytest.fixture(scope="session")
+def image_processor():
+    """測試用的 ImageProcessor 實例
+
+    session 層級共用（兩個測試類別皆可取用）：服務內建的內容雜湊
+    結果快取可跨測試重用，對同一張圖片的重複識別不會再觸發新的
+    Claude API 呼叫
+    """
+    return ImageProcessor()
+
+@pytest.fixture(scope="session")
+def data_path():
+    """Data 資料夾路徑"""
+    return _DATA_DIR
+
+@pytest.fixture(scope="session")
+def data_images():
+    """Data 資料夾中的圖片檔案（收集階段掃描一次，大小寫不敏感）"""
+    return list(_DATA_IMAGES)
+
 class TestRealImageRecognition:
     """
     真實照片識別測試
     確保系統能正確識別特定照片中的電池資訊
     """
     
-    # 預期的測試結果
-    EXPECTED_RESULTS = {
+    # 預期的測試結果（唯讀：session 共用的 fixture 下防止測試間互相汙染）
+    EXPECTED_RESULTS = MappingProxyType({
         'PXL_20250724_010217469.jpg': {
             'total_cells': 4,
-            'cells': [
-                {
-                    'serial_number': 'C048026',
-                    'model': '6754E4',
-                    'energy': 36.72,
-                    'capacity': 10.8,
-                    'voltage': 3.40
-                },
-                {
-                    'serial_number': 'C044817',
-                    'model': '6754E4',
-                    'energy': 36.72,
-                    'capacity': 10.8,
-                    'voltage': 3.40
-                },
-                {
-                    'serial_number': 'C046758',
-                    'model': '6754E4',
-                    'energy': 36.72,
-                    'capacity': 10.8,
-                    'voltage': 3.40
-                },
-                {
-                    'serial_number': 'C048463',
-                    'model': '6754E4',
-                    'energy': 36.72,
-                    'capacity': 10.8,
-                    'voltage': 3.40
-                }
-            ]
+            'cells': (
+                Cell('C048026', '6754E4', 36.72, 10.8, 3.40),
+                Cell('C044817', '6754E4', 36.72, 10.8, 3.40),
+                Cell('C046758', '6754E4', 36.72, 10.8, 3.40),
+                Cell('C048463', '6754E4', 36.72, 10.8, 3.40),
+            )
         },
         'PXL_20250724_010602031.jpg': {
             'total_cells': 8,
-            'cells': [
-                {
-                    'serial_number': 'C042316',
-                    'model': '6754E4',
-                    'energy': 36.72,
-                    'capacity': 10.8,
-                    'voltage': 3.40
-                },
-                {
-                    'serial_number': 'C049332',
-                    'model': '6754E4',
-                    'energy': 36.72,
-                    'capacity': 10.8,
-                    'voltage': 3.40
-                },
-                {
-                    'serial_number': 'C0494219',  # Note: This appears to have 7 digits, might be C049421
-                    'model': '6754E4',
-                    'energy': 36.72,
-                    'capacity': 10.8,
-                    'voltage': 3.40
-                },
-                {
-                    'serial_number': 'C048397',
-                    'model': '6754E4',
-                    'energy': 36.72,
-                    'capacity': 10.8,
-                    'voltage': 3.40
-                }
+            'cells': (
+                Cell('C042316', '6754E4', 36.72, 10.8, 3.40),
+                Cell('C049332', '6754E4', 36.72, 10.8, 3.40),
+                # Note: C0494219 appears to have 7 digits, might be C049421
+                Cell('C0494219', '6754E4', 36.72, 10.8, 3.40),
+                Cell('C048397', '6754E4', 36.72, 10.8, 3.40),
                 # Note: Only 4 cells specified in test case, but total_cells is 8
                 # The remaining 4 cells' data would need to be provided for complete testing
-            ]
+            )
         }
-    }
-    
-    @pytest.fixture
-    def image_processor(self):
-        """測試用的 ImageProcessor 實例"""
-        return ImageProcessor()
-    
-    @pytest.fixture
-    def data_path(self):
-        """Data 資料夾路徑"""
-        return Path(__file__).parent.parent / "data"
+    })
     
+
     def get_image_path(self, data_path: Path, filename: str) -> str:
         """取得圖片完整路徑"""
         image_path = data_path / filename
@@ -119,11 +126,11 @@ class TestRealImageRecognition:
             比對結果字典，包含各欄位是否匹配
         """
         result = {
-            'serial_number': actual.serial_number == expected['serial_number'],
-            'model': actual.model == expected['model'],
-            'energy': abs(actual.energy - expected['energy']) <= tolerance,
-            'capacity': abs(actual.capacity - expected['capacity']) <= tolerance,
-            'voltage': abs(actual.voltage - expected['voltage']) <= tolerance,
+            'serial_number': actual.serial_number == expected.serial_number,
+            'model': actual.model == expected.model,
+            'energy': abs(actual.energy - expected.energy) <= tolerance,
+            'capacity': abs(actual.capacity - expected.capacity) <= tolerance,
+            'voltage': abs(actual.voltage - expected.voltage) <= tolerance,
         }
         
         # 計算總分
@@ -138,30 +145,58 @@ class TestRealImageRecognition:
         Returns:
             匹配結果列表，每個元素包含 (actual_battery, expected_battery, match_score)
         """
-        matches = []
-        used_expected = set()
-        
-        for actual in actual_batteries:
-            best_match = None
-            best_score = 0
-            best_expected_idx = -1
-            
-            for i, expected in enumerate(expected_batteries):
-                if i in used_expected:
+        if not actual_batteries or not expected_batteries:
+            return [(actual, None, 0) for actual in actual_batteries]
+
+        tolerance = 0.01
+
+        # 一次算出所有 (actual, expected) 配對的分數矩陣，取代逐對的字典比對
+        actual_values = np.array(
+            [[b.energy, b.capacity, b.voltage] for b in actual_batteries], dtype=np.float64
+        )
+        expected_values = np.array(
+            [[c.energy, c.capacity, c.voltage] for c in expected_batteries], dtype=np.float64
+        )
+        numeric_hits = (
+            np.abs(actual_values[:, None, :] - expected_values[None, :, :]) <= tolerance
+        ).sum(axis=2)
+
+        serial_hits = np.array(
+            [[b.serial_number == c.serial_number for c in expected_batteries] for b in actual_batteries]
+        )
+        model_hits = np.array(
+            [[b.model == c.model for c in expected_batteries] for b in actual_batteries]
+        )
+
+        scores = (numeric_hits + serial_hits + model_hits) / 5.0
+
+        # 以分數矩陣求整體最佳的一對一指派：
+        # scipy 可用時用 Hungarian 演算法（全域最佳），否則退回
+        # 「全配對分數由高到低」的貪婪指派，避免逐列貪婪過早鎖定次佳配對
+        assignment = {}
+        if SCIPY_AVAILABLE:
+            row_ind, col_ind = linear_sum_assignment(-scores)
+            assignment = dict(zip(row_ind, col_ind))
+        else:
+            order = np.argsort(scores, axis=None)[::-1]
+            used_rows = set()
+            used_cols = set()
+            for flat_idx in order:
+                row, col = divmod(int(flat_idx), scores.shape[1])
+                if row in used_rows or col in used_cols:
                     continue
-                
-                comparison = self.compare_battery_data(actual, expected)
-                if comparison['total_score'] > best_score:
-                    best_score = comparison['total_score']
-                    best_match = expected
-                    best_expected_idx = i
-            
-            if best_match and best_score > 0.6:  # 至少60%匹配度
-                matches.append((actual, best_match, best_score))
-                used_expected.add(best_expected_idx)
+                assignment[row] = col
+                used_rows.add(row)
+                used_cols.add(col)
+
+        matches = []
+        for row, actual in enumerate(actual_batteries):
+            col = assignment.get(row)
+            if col is not None and scores[row, col] > 0.6:  # 至少60%匹配度
+                matches.append((actual, expected_batteries[col], float(scores[row, col])))
             else:
                 matches.append((actual, None, 0))
-        
+
         return matches
     
     @pytest.mark.asyncio
@@ -185,19 +220,19 @@ class TestRealImageRecognition:
         perfect_matches = sum(1 for _, _, score in matches if score >= 0.9)
         good_matches = sum(1 for _, _, score in matches if score >= 0.7)
         
-        print(f"\n=== {filename} 識別結果 ===")
-        print(f"預期電池數: {expected['total_cells']}, 實際識別: {len(results)}")
-        print(f"完美匹配: {perfect_matches}/{len(matches)}")
-        print(f"良好匹配: {good_matches}/{len(matches)}")
+        log.info("=== %s 識別結果 ===", filename)
+        log.info("預期電池數: %d, 實際識別: %d", expected['total_cells'], len(results))
+        log.info("完美匹配: %d/%d", perfect_matches, len(matches))
+        log.info("良好匹配: %d/%d", good_matches, len(matches))
         
         for i, (actual, expected_match, score) in enumerate(matches):
-            print(f"\n電池 {i+1}:")
-            print(f"  識別: {actual.serial_number}, {actual.model}, {actual.energy}Wh, {actual.capacity}Ah, {actual.voltage}V")
+            log.info("電池 %d:", i + 1)
+            log.info("  識別: %s, %s, %sWh, %sAh, %sV", actual.serial_number, actual.model, actual.energy, actual.capacity, actual.voltage)
             if expected_match:
-                print(f"  預期: {expected_match['serial_number']}, {expected_match['model']}, {expected_match['energy']}Wh, {expected_match['capacity']}Ah, {expected_match['voltage']}V")
-                print(f"  匹配度: {score:.2f}")
+                log.info("  預期: %s, %s, %sWh, %sAh, %sV", expected_match.serial_number, expected_match.model, expected_match.energy, expected_match.capacity, expected_match.voltage)
+                log.info("  匹配度: %.2f", score)
             else:
-                print(f"  未找到匹配的預期結果")
+                log.info("  未找到匹配的預期結果")
         
         # 至少要有70%的電池獲得良好匹配
         assert good_matches >= expected['total_cells'] * 0.7, \
@@ -223,65 +258,64 @@ class TestRealImageRecognition:
         
         good_matches = sum(1 for _, _, score in matches if score >= 0.7)
         
-        print(f"\n=== {filename} 識別結果 ===")
-        print(f"預期電池數: {expected['total_cells']}, 實際識別: {len(results)}")
-        print(f"已知電池資料: {len(known_cells)}")
-        print(f"良好匹配: {good_matches}/{len(known_cells)}")
+        log.info("=== %s 識別結果 ===", filename)
+        log.info("預期電池數: %d, 實際識別: %d", expected['total_cells'], len(results))
+        log.info("已知電池資料: %d", len(known_cells))
+        log.info("良好匹配: %d/%d", good_matches, len(known_cells))
         
         for i, (actual, expected_match, score) in enumerate(matches):
-            print(f"\n電池 {i+1}:")
-            print(f"  識別: {actual.serial_number}, {actual.model}, {actual.energy}Wh, {actual.capacity}Ah, {actual.voltage}V")
+            log.info("電池 %d:", i + 1)
+            log.info("  識別: %s, %s, %sWh, %sAh, %sV", actual.serial_number, actual.model, actual.energy, actual.capacity, actual.voltage)
             if expected_match:
-                print(f"  預期: {expected_match['serial_number']}, {expected_match['model']}, {expected_match['energy']}Wh, {expected_match['capacity']}Ah, {expected_match['voltage']}V")
-                print(f"  匹配度: {score:.2f}")
+                log.info("  預期: %s, %s, %sWh, %sAh, %sV", expected_match.serial_number, expected_match.model, expected_match.energy, expected_match.capacity, expected_match.voltage)
+                log.info("  匹配度: %.2f", score)
         
         # 顯示其他識別到的電池
         if len(results) > len(known_cells):
-            print(f"\n其他識別到的電池:")
+            log.info("其他識別到的電池:")
             for i, battery in enumerate(results[len(known_cells):], len(known_cells) + 1):
-                print(f"  電池 {i}: {battery.serial_number}, {battery.model}, {battery.energy}Wh, {battery.capacity}Ah, {battery.voltage}V")
+                log.info("  電池 %d: %s, %s, %sWh, %sAh, %sV", i, battery.serial_number, battery.model, battery.energy, battery.capacity, battery.voltage)
         
         # 至少要有70%的已知電池獲得良好匹配
         assert good_matches >= len(known_cells) * 0.7, \
             f"只有 {good_matches}/{len(known_cells)} 個已知電池達到良好匹配標準"
     
     @pytest.mark.asyncio
-    async def test_recognition_methods_comparison(self, data_path):
+    async def test_recognition_methods_comparison(self, image_processor, data_path):
         """比較 Claude AI 和傳統 OCR 的識別效果"""
         filename = 'PXL_20250724_010217469.jpg'
         image_path = self.get_image_path(data_path, filename)
         expected = self.EXPECTED_RESULTS[filename]
         
-        # 測試 Claude AI (如果可用)
-        claude_service = ClaudeVisionService()
+        # 測試 Claude AI (如果可用)（共用 session 實例，命中結果快取時不重打 API）
+        claude_service = image_processor.claude_service
         claude_results = []
         if claude_service.is_available():
             claude_results = await claude_service.analyze_battery_image(image_path, filename)
-        
+
         # 測試傳統 OCR
-        image_processor = ImageProcessor()
         ocr_results = await image_processor.process_image_with_ocr(image_path)
         
-        print(f"\n=== 識別方法比較: {filename} ===")
+        log.info("=== 識別方法比較: %s ===", filename)
         
         # Claude AI 結果
         if claude_results:
             claude_matches = self.find_best_match(claude_results, expected['cells'])
             claude_good_matches = sum(1 for _, _, score in claude_matches if score >= 0.7)
-            print(f"\nClaude AI:")
-            print(f"  識別數量: {len(claude_results)}")
-            print(f"  良好匹配: {claude_good_matches}/{len(expected['cells'])}")
-            print(f"  準確率: {claude_good_matches / len(expected['cells']) * 100:.1f}%")
+            log.info("Claude AI:")
+            log.info("  識別數量: %d", len(claude_results))
+            log.info("  良好匹配: %d/%d", claude_good_matches, len(expected['cells']))
+            log.info("  準確率: %.1f%%", claude_good_matches / len(expected['cells']) * 100)
         else:
-            print(f"\nClaude AI: 不可用 (未設定 API Key)")
+            log.info("Claude AI: 不可用 (未設定 API Key)")
         
         # 傳統 OCR 結果
         ocr_matches = self.find_best_match(ocr_results, expected['cells'])
         ocr_good_matches = sum(1 for _, _, score in ocr_matches if score >= 0.7)
-        print(f"\n傳統 OCR:")
-        print(f"  識別數量: {len(ocr_results)}")
-        print(f"  良好匹配: {ocr_good_matches}/{len(expected['cells'])}")
-        print(f"  準確率: {ocr_good_matches / len(expected['cells']) * 100:.1f}%")
+        log.info("傳統 OCR:")
+        log.info("  識別數量: %d", len(ocr_results))
+        log.info("  良好匹配: %d/%d", ocr_good_matches, len(expected['cells']))
+        log.info("  準確率: %.1f%%", ocr_good_matches / len(expected['cells']) * 100)
         
         # 至少有一種方法要能達到基本要求
         has_working_method = (
@@ -292,111 +326,89 @@ class TestRealImageRecognition:
         assert has_working_method, "沒有任何識別方法能達到50%的基本准確率要求"
     
     @pytest.mark.asyncio
-    async def test_all_data_images_basic_recognition(self, image_processor, data_path):
-        """對所有 data 資料夾中的圖片進行基本識別測試"""
-        image_files = list(data_path.glob("*.jpg")) + list(data_path.glob("*.jpeg")) + list(data_path.glob("*.png"))
-        
-        if not image_files:
-            pytest.skip("No image files found in data folder")
-        
-        print(f"\n=== 批次識別測試 ===")
-        print(f"找到 {len(image_files)} 個圖片檔案")
-        
-        total_batteries = 0
-        successful_files = 0
-        
-        for image_file in image_files:
-            try:
-                results = await image_processor.process_image(str(image_file))
-                battery_count = len(results)
-                total_batteries += battery_count
-                
-                if battery_count > 0:
-                    successful_files += 1
-                
-                print(f"  {image_file.name}: {battery_count} 個電池")
-                
-                # 顯示識別到的電池概要
-                for i, battery in enumerate(results[:3]):  # 只顯示前3個
-                    print(f"    {i+1}. {battery.serial_number} ({battery.model})")
-                if len(results) > 3:
-                    print(f"    ... 還有 {len(results) - 3} 個電池")
-                    
-            except Exception as e:
-                print(f"  {image_file.name}: 處理失敗 - {str(e)}")
-        
-        print(f"\n總結:")
-        print(f"  成功處理: {successful_files}/{len(image_files)} 個檔案")
-        print(f"  識別電池總數: {total_batteries} 個")
-        print(f"  平均每張圖片: {total_batteries / len(image_files):.1f} 個電池")
-        
+    @pytest.mark.parametrize("image_file", _DATA_IMAGES, ids=lambda p: p.name)
+    async def test_single_image_basic_recognition(self, image_file, image_processor):
+        """單張圖片的基本識別（每張圖各自成為測試項目，可獨立重跑或分散執行）"""
+        try:
+            results = await image_processor.process_image(str(image_file))
+        except Exception as e:
+            _BATCH_OUTCOMES[image_file.name] = 0
+            pytest.fail(f"{image_file.name}: 處理失敗 - {e}")
+
+        battery_count = len(results)
+        _BATCH_OUTCOMES[image_file.name] = battery_count
+
+        log.info("%s: %d 個電池", image_file.name, battery_count)
+
+        # 顯示識別到的電池概要
+        for i, battery in enumerate(results[:3]):  # 只顯示前3個
+            log.info("  %d. %s (%s)", i + 1, battery.serial_number, battery.model)
+        if battery_count > 3:
+            log.info("  ... 還有 %d 個電池", battery_count - 3)
+
+        assert isinstance(results, list)
+
+    @pytest.mark.skipif(not _DATA_IMAGES, reason="No image files found in data folder")
+    def test_batch_recognition_summary(self):
+        """彙總逐圖識別結果：至少要有一半的圖片能成功識別出電池"""
+        if len(_BATCH_OUTCOMES) < len(_DATA_IMAGES):
+            # xdist 分散執行時逐圖結果散在不同 worker，本行程無從彙總
+            pytest.skip("Per-image outcomes unavailable in this process")
+
+        successful_files = sum(1 for count in _BATCH_OUTCOMES.values() if count > 0)
+        total_batteries = sum(_BATCH_OUTCOMES.values())
+
+        log.info("=== 批次識別總結 ===")
+        log.info("  成功處理: %d/%d 個檔案", successful_files, len(_DATA_IMAGES))
+        log.info("  識別電池總數: %d 個", total_batteries)
+        log.info("  平均每張圖片: %.1f 個電池", total_batteries / len(_DATA_IMAGES))
+
         # 基本要求：至少要有一半的圖片能成功識別出電池
-        assert successful_files >= len(image_files) * 0.5, \
-            f"只有 {successful_files}/{len(image_files)} 個圖片成功識別出電池"
+        assert successful_files >= len(_DATA_IMAGES) * 0.5, \
+            f"只有 {successful_files}/{len(_DATA_IMAGES)} 個圖片成功識別出電池"
     
     def test_expected_data_integrity(self):
-        """驗證預期結果數據的完整性"""
+        """驗證預期結果數據的完整性（欄位存在、型別與數值範圍一次驗證）"""
         for filename, data in self.EXPECTED_RESULTS.items():
-            # 檢查必要欄位
-            assert 'total_cells' in data, f"{filename}: 缺少 total_cells 欄位"
-            assert 'cells' in data, f"{filename}: 缺少 cells 欄位"
-            assert isinstance(data['total_cells'], int), f"{filename}: total_cells 必須是整數"
-            assert isinstance(data['cells'], list), f"{filename}: cells 必須是列表"
-            
-            # 檢查每個電池資料
-            for i, cell in enumerate(data['cells']):
-                required_fields = ['serial_number', 'model', 'energy', 'capacity', 'voltage']
-                for field in required_fields:
-                    assert field in cell, f"{filename} 電池 {i+1}: 缺少 {field} 欄位"
-                
-                # 檢查資料類型和合理性
-                assert isinstance(cell['serial_number'], str), f"{filename} 電池 {i+1}: serial_number 必須是字串"
-                assert isinstance(cell['model'], str), f"{filename} 電池 {i+1}: model 必須是字串"
-                assert isinstance(cell['energy'], (int, float)), f"{filename} 電池 {i+1}: energy 必須是數字"
-                assert isinstance(cell['capacity'], (int, float)), f"{filename} 電池 {i+1}: capacity 必須是數字"
-                assert isinstance(cell['voltage'], (int, float)), f"{filename} 電池 {i+1}: voltage 必須是數字"
-                
-                # 檢查數值合理性
-                assert 0 < cell['energy'] < 100, f"{filename} 電池 {i+1}: energy 值不合理"
-                assert 0 < cell['capacity'] < 50, f"{filename} 電池 {i+1}: capacity 值不合理"
-                assert 0 < cell['voltage'] < 10, f"{filename} 電池 {i+1}: voltage 值不合理"
-        
-        print("✅ 預期結果數據驗證通過")
+            try:
+                _ExpectedFile.model_validate({
+                    'total_cells': data['total_cells'],
+                    'cells': [cell._asdict() for cell in data['cells']],
+                })
+            except ValidationError as e:
+                pytest.fail(f"{filename}: 預期結果格式錯誤 - {e}")
+
+        log.info("預期結果數據驗證通過")
 
 class TestImageRecognitionAccuracy:
     """圖片識別準確性測試"""
     
     @pytest.mark.asyncio
-    async def test_recognition_consistency(self):
+    async def test_recognition_consistency(self, image_processor, data_path):
         """測試識別結果的一致性（多次識別同一張圖片）"""
-        data_path = Path(__file__).parent.parent / "data"
         filename = 'PXL_20250724_010217469.jpg'
         image_path = data_path / filename
-        
+
         if not image_path.exists():
             pytest.skip(f"Image file {filename} not found")
-        
-        image_processor = ImageProcessor()
-        
-        # 執行5次識別
-        results_list = []
-        for i in range(5):
-            results = await image_processor.process_image(str(image_path))
-            results_list.append(results)
-        
+
+        # 執行5次識別（併發執行，總耗時貼近單次呼叫的延遲）
+        results_list = await asyncio.gather(
+            *(image_processor.process_image(str(image_path)) for _ in range(5))
+        )
+
         # 檢查結果數量一致性
         counts = [len(results) for results in results_list]
         assert min(counts) == max(counts), f"識別結果數量不一致: {counts}"
         
-        print(f"\n=== 識別一致性測試 ===")
-        print(f"5次識別結果數量: {counts}")
-        print("✅ 識別數量保持一致")
+        log.info("=== 識別一致性測試 ===")
+        log.info("5次識別結果數量: %s", counts)
+        log.info("識別數量保持一致")
     
     @pytest.mark.asyncio
-    async def test_edge_cases(self):
+    async def test_edge_cases(self, image_processor):
         """測試邊緣情況"""
-        image_processor = ImageProcessor()
-        
+
         # 測試不存在的圖片
         results = await image_processor.process_image("nonexistent.jpg")
         assert results == [], "不存在圖片應返回空列表"
@@ -405,4 +417,4 @@ class TestImageRecognitionAccuracy:
         results = await image_processor.process_image("")
         assert results == [], "空路徑應返回空列表"
         
-        print("✅ 邊緣情況測試通過")
\ No newline at end of file
+        log.info("邊緣情況測試通過")
\ No newline at end of file